@@ -1,4 +1,5 @@
 import 'package:flutter/services.dart';
+import 'dart:convert';
 import 'dart:io';
 import 'package:path_provider/path_provider.dart';
 
@@ -33,8 +34,12 @@ class PoseImageManager {
       final allSubclustersDir = Directory(allSubclustersPath);
       
       if (allSubclustersDir.existsSync()) {
-        // 扫描所有子目录
-        await _scanDirectory(allSubclustersDir, '');
+        // 优先读取 tools/index_subclusters.py 生成的离线索引；
+        // 没有索引或索引生成后目录有变化时，扫描所有子目录
+        final indexFile = File('$allSubclustersPath/subcluster_index.json');
+        if (!indexFile.existsSync() || !_loadSubclusterIndex(indexFile, allSubclustersPath)) {
+          await _scanDirectory(allSubclustersDir, '');
+        }
         
         print('已加载 ${_sampleImages.length} 张样本图片');
         print('分类数量: ${_categoryImages.length}');
@@ -54,6 +59,46 @@ class PoseImageManager {
     }
   }
 
+  /// 读取离线索引；索引已过期时不加载并返回 false
+  bool _loadSubclusterIndex(File indexFile, String rootPath) {
+    final index = jsonDecode(indexFile.readAsStringSync()) as Map<String, dynamic>;
+    if (!_isSubclusterIndexFresh(index, indexFile, rootPath)) {
+      print('离线索引已过期，重新扫描: ${indexFile.path}');
+      return false;
+    }
+    final categories = index['categories'] as Map<String, dynamic>;
+
+    categories.forEach((category, paths) {
+      for (final relativePath in paths as List) {
+        final filePath = '$rootPath/$relativePath';
+        _sampleImages.add(filePath);
+        _categoryImages.putIfAbsent(category, () => []).add(filePath);
+      }
+    });
+    return true;
+  }
+
+  /// 索引中每个目录的修改时间都与当前一致时索引才有效（照片增删会更新所在目录的修改时间）
+  bool _isSubclusterIndexFresh(Map<String, dynamic> index, File indexFile, String rootPath) {
+    final directories = index['directories'] as Map<String, dynamic>?;
+    if (directories == null) return false;
+
+    final indexModified = indexFile.statSync().modified;
+    for (final entry in directories.entries) {
+      final stat = FileStat.statSync(entry.key.isEmpty ? rootPath : '$rootPath/${entry.key}');
+      if (stat.type != FileSystemEntityType.directory) return false;
+
+      if (entry.key.isEmpty) {
+        // 索引文件写在根目录中，写入本身会更新根目录的修改时间，只要求不晚于索引文件
+        if (stat.modified.isAfter(indexModified)) return false;
+      } else {
+        final recorded = (entry.value['mtime_ns'] as int) ~/ 1000000;
+        if (stat.modified.millisecondsSinceEpoch != recorded) return false;
+      }
+    }
+    return true;
+  }
+
   Future<void> _scanSampleAssets() async {
     try {
       final manifestString = await rootBundle.loadString('assets/images/asset_manifest.json');
@@ -8,6 +8,12 @@ import json
 import random
 from pathlib import Path
 from collections import Counter
+from itertools import accumulate
+
+import numpy as np
+
+from seeding import stable_seed
+from tracing import traced
 
 # 景别定义
 SHOT_SIZES = ['特写', '近景', '中景', '全景', '远景']
@@ -25,16 +31,23 @@ SHOT_SIZE_BIAS = {
     'ethnic_wear': {'特写': 0.1, '近景': 0.2, '中景': 0.35, '全景': 0.3, '远景': 0.05},
 }
 
+def get_clothing_type(category: str):
+    """从分类中提取服装类型，无匹配时返回None"""
+    for ct in SHOT_SIZE_BIAS.keys():
+        if ct in category:
+            return ct
+    return None
+
+def shot_size_seed(category: str, filename: str) -> int:
+    """景别分配使用的随机种子"""
+    return stable_seed(f"{category}_{filename}_shot_size")
+
 def get_shot_size_by_category(category: str, filename: str, rng: random.Random) -> str:
     """
     根据分类获取景别，使用加权随机
     """
     # 提取服装类型
-    clothing_type = None
-    for ct in SHOT_SIZE_BIAS.keys():
-        if ct in category:
-            clothing_type = ct
-            break
+    clothing_type = get_clothing_type(category)
     
     if clothing_type:
         # 使用加权分布
@@ -46,6 +59,70 @@ def get_shot_size_by_category(category: str, filename: str, rng: random.Random)
         # 默认均匀分布
         return rng.choice(SHOT_SIZES)
 
+def first_draws(seeds):
+    """
+    对每个不同的种子计算 random.Random(seed) 的首次抽样
+
+    Returns:
+        元组 (首个 random() 值数组, 首次 choice(SHOT_SIZES) 下标数组)，与 seeds 对齐
+    """
+    unique_seeds, inverse = np.unique(seeds, return_inverse=True)
+    first_random = np.empty(len(unique_seeds))
+    uniform_index = np.empty(len(unique_seeds), dtype=np.int64)
+    for j, seed in enumerate(unique_seeds.tolist()):
+        first_random[j] = random.Random(seed).random()
+        uniform_index[j] = random.Random(seed).randrange(len(SHOT_SIZES))
+    return first_random[inverse], uniform_index[inverse]
+
+def assign_shot_sizes(categories, filenames):
+    """
+    批量分配景别，结果与逐张调用 get_shot_size_by_category 完全一致
+
+    每张图片只消耗种子生成器的第一次抽样：加权分布等价于
+    bisect(cum_weights, random() * total)，默认分布等价于 randrange(5)，
+    因此可以先批量算出每个种子的首次抽样，再按服装类型分组向量化查找。
+
+    Returns:
+        景别下标数组（对应 SHOT_SIZES）
+    """
+    seeds = np.fromiter((shot_size_seed(c, f) for c, f in zip(categories, filenames)),
+                        dtype=np.int64, count=len(filenames))
+    first_random, result = first_draws(seeds)
+
+    types = np.array([get_clothing_type(c) or '' for c in categories], dtype=object)
+    for clothing_type, weights in SHOT_SIZE_BIAS.items():
+        mask = types == clothing_type
+        if not mask.any():
+            continue
+        cum_weights = np.array(list(accumulate(weights.values())))
+        picks = np.searchsorted(cum_weights, first_random[mask] * cum_weights[-1], side='right')
+        picks = np.minimum(picks, len(cum_weights) - 1)
+        lookup = np.array([SHOT_SIZES.index(name) for name in weights])
+        result[mask] = lookup[picks]
+    return result
+
+@traced('shot_size')
+def apply_shot_size_tags(data):
+    """
+    为内存中的manifest添加景别标签
+
+    Returns:
+        景别分布 Counter
+    """
+    files = data.get('files', [])
+
+    # 使用文件名的稳定哈希作为随机种子，确保同一照片每次分配相同的景别
+    categories = [item.get('category', '') for item in files]
+    filenames = [Path(item['asset_path']).name for item in files]
+    shot_indices = assign_shot_sizes(categories, filenames)
+
+    # 添加到 simple_tags
+    for item, shot_index in zip(files, shot_indices.tolist()):
+        item.setdefault('simple_tags', {})['shot_size'] = SHOT_SIZES[shot_index]
+
+    counts = np.bincount(shot_indices, minlength=len(SHOT_SIZES))
+    return Counter({name: int(count) for name, count in zip(SHOT_SIZES, counts) if count})
+
 def add_shot_size_tags():
     """为所有照片添加景别标签"""
     manifest_path = Path('assets/images/asset_manifest.json')
@@ -56,37 +133,22 @@ def add_shot_size_tags():
     files = data.get('files', [])
     print(f"正在为 {len(files)} 张照片添加景别标签...")
     
-    # 统计分布
-    distribution = Counter()
-    
-    # 为每张照片添加景别标签
-    for item in files:
-        category = item.get('category', '')
-        filename = Path(item['asset_path']).name
-        
-        # 使用文件名hash作为随机种子，确保同一照片每次分配相同的景别
-        seed = hash(f"{category}_{filename}_shot_size") % 10000
-        rng = random.Random(seed)
-        
-        # 获取景别
-        shot_size = get_shot_size_by_category(category, filename, rng)
-        
-        # 添加到 simple_tags
-        if 'simple_tags' not in item:
-            item['simple_tags'] = {}
-        item['simple_tags']['shot_size'] = shot_size
-        
-        distribution[shot_size] += 1
-        
-        if (list(files).index(item) + 1) % 500 == 0:
-            print(f"  已处理 {list(files).index(item) + 1}/{len(files)} 张照片")
+    distribution = apply_shot_size_tags(data)
     
     # 保存更新后的 manifest
     with open(manifest_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
     
     print(f"\n完成！已为 {len(files)} 张照片添加景别标签")
-    
-    # 打印分布统计
+    print_distribution(distribution, len(files))
+
+def print_distribution(distribution, total):
+    """打印景别分布统计"""
     print("\n景别分布统计：")
     for shot_size in SHOT_SIZES:
+        count = distribution[shot_size]
+        percent = count / total * 100 if total else 0
+        print(f"  {shot_size}: {count} 张 ({percent:.1f}%)")
+
+if __name__ == '__main__':
+    add_shot_size_tags()
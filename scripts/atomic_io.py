@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+原子写入工具
+先写入同目录下的 <目标>.tmp 并落盘，再 os.replace 替换目标；
+进程在任何时刻中断，目标文件要么是旧内容，要么是完整的新内容
+"""
+
+import os
+import json
+from pathlib import Path
+
+
+def write_atomic(path, data):
+    """原子写入字节串；失败时删除临时文件并重新抛出异常"""
+    tmp_path = Path(f'{path}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def dumps_json(data, indent=None, sort_keys=False):
+    """序列化为UTF-8字节串；不缩进时使用紧凑分隔符"""
+    separators = None if indent else (',', ':')
+    return json.dumps(data, ensure_ascii=False, indent=indent, separators=separators,
+                      sort_keys=sort_keys).encode('utf-8')
+
+
+def write_json(path, data, indent=None, sort_keys=False):
+    """原子写入JSON"""
+    write_atomic(path, dumps_json(data, indent, sort_keys))
+
+
+def load_json(path, default=None):
+    """读取JSON；文件不存在或无法解析时返回 default"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
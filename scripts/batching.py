@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+进程池批量分发
+把任务流按批次提交给执行器，限制在途批次数，父进程内存与任务总数无关
+"""
+
+from concurrent.futures import wait, FIRST_COMPLETED
+from itertools import islice
+
+
+def iter_batches(iterable, size):
+    """将任务流切分为固定大小的批次"""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def imap_unordered_bounded(executor, batch_func, tasks, chunksize, max_inflight):
+    """
+    类似 Pool.imap_unordered 的流式分发
+
+    任务按 chunksize 分批提交给 batch_func，同时在途的批次数不超过
+    max_inflight，父进程内存只与窗口大小有关，而与任务总数无关。
+
+    Yields:
+        每个任务的结果（按完成顺序）
+    """
+    batches = iter_batches(tasks, chunksize)
+    inflight = {executor.submit(batch_func, batch) for batch in islice(batches, max_inflight)}
+
+    while inflight:
+        done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield from future.result()
+            batch = next(batches, None)
+            if batch is not None:
+                inflight.add(executor.submit(batch_func, batch))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+位图索引基准测试
+对比倒排位图查询与对 files 的线性扫描（结果必须一致）
+"""
+
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+from bitmap_index import read_index, query
+
+
+def linear_scan(files, positions, criteria):
+    """逐条检查 full_code 的基准实现"""
+    checks = [(positions.index(position), set(codes) if not isinstance(codes, str) else {codes})
+              for position, codes in criteria.items()]
+    return [i for i, f in enumerate(files)
+            if all(f['full_code'][pos] in codes for pos, codes in checks)]
+
+
+def random_criteria(rng, definitions, max_dims):
+    """随机生成 1~max_dims 个编码位的筛选条件，每位 1~2 个代码"""
+    positions = rng.sample(list(definitions), rng.randint(1, max_dims))
+    return {p: rng.sample(list(definitions[p]), rng.randint(1, 2)) for p in positions}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='位图索引基准测试')
+    parser.add_argument('--manifest', type=str, default='assets/images/asset_manifest.json',
+                        help='JSON manifest路径')
+    parser.add_argument('--queries', type=int, default=500,
+                        help='随机查询数 (默认500)')
+    parser.add_argument('--max-dims', type=int, default=4,
+                        help='每个查询最多组合的编码位数 (默认4)')
+
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = manifest['files']
+    definitions = manifest['encoding_definitions']
+    positions = list(definitions)
+
+    count, index = read_index(manifest_path.with_suffix('.idx'))
+    if count != len(files):
+        print(f"索引与manifest不一致: {count} != {len(files)}")
+        return
+
+    rng = random.Random(42)
+    workload = [random_criteria(rng, definitions, args.max_dims) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    scan_results = [linear_scan(files, positions, c) for c in workload]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_results = [query(index, count, c) for c in workload]
+    index_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(scan_results, index_results) if a != b)
+
+    print(f"图片: {len(files)} 张, 查询: {len(workload)} 个")
+    print("-" * 50)
+    print(f"线性扫描: {scan_time * 1000 / len(workload):.3f} ms/查询")
+    print(f"位图索引: {index_time * 1000 / len(workload):.3f} ms/查询 ({scan_time / index_time:.1f}x)")
+    print(f"结果不一致: {mismatches} 个")
+
+
+if __name__ == '__main__':
+    main()
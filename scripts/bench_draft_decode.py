@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+draft 解码基准测试
+对比完整解码与 DCT 域降采样解码的吞吐量和画质差异（不修改原图）
+"""
+
+import time
+import argparse
+from io import BytesIO
+from pathlib import Path
+from PIL import Image
+
+from image_io import load_resized, target_size
+from image_metrics import ssim
+
+
+def encode_jpeg(img, quality):
+    """编码为JPEG字节"""
+    buf = BytesIO()
+    img.save(buf, 'JPEG', quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def decode_timed(img_path, max_size, quality, draft):
+    """
+    按指定路径解码、缩放并编码一张图片
+
+    Returns:
+        元组 (耗时秒数, 缩放后图片)
+    """
+    start = time.perf_counter()
+    with Image.open(img_path) as img:
+        resized = load_resized(img, max_size, draft)
+        encode_jpeg(resized, quality)
+    return time.perf_counter() - start, resized
+
+
+def needs_downscale(img_path, max_size):
+    """只读取文件头判断是否需要缩放；不需要缩放时 draft 不会生效"""
+    with Image.open(img_path) as img:
+        return target_size(img.size, max_size) is not None
+
+
+def run_paths(image_files, max_size, quality):
+    """
+    逐张对比完整解码与 draft 解码
+
+    两条路径的结果就地计算 SSIM 后即丢弃，内存只与单张图片有关。
+
+    Returns:
+        元组 (完整解码耗时, draft解码耗时, SSIM列表)
+    """
+    base_time = draft_time = 0.0
+    scores = []
+    for img_path in image_files:
+        seconds, base = decode_timed(img_path, max_size, quality, draft=False)
+        base_time += seconds
+        seconds, drafted = decode_timed(img_path, max_size, quality, draft=True)
+        draft_time += seconds
+        scores.append(ssim(base, drafted))
+        del base, drafted
+    return base_time, draft_time, scores
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='draft解码基准测试')
+    parser.add_argument('--images-dir', type=str, default='assets/images/pose_samples',
+                        help='图片目录 (默认assets/images/pose_samples)')
+    parser.add_argument('--limit', type=int, default=200,
+                        help='参与测试的图片数 (默认200)')
+    parser.add_argument('--max-size', type=int, default=1200,
+                        help='最大边长像素 (默认1200)')
+    parser.add_argument('--quality', type=int, default=75,
+                        help='JPEG质量 (默认75)')
+
+    args = parser.parse_args()
+
+    image_files = sorted(Path(args.images_dir).glob('*.jpg'))[:args.limit]
+    if not image_files:
+        print("未找到图片文件")
+        return
+
+    # 不超过最大尺寸的图片无需缩放，两条路径完全相同，计入会稀释对比结果
+    scaled_files = [p for p in image_files if needs_downscale(p, args.max_size)]
+    skipped = len(image_files) - len(scaled_files)
+    if skipped:
+        print(f"⚠️  {skipped} 张图片不超过 {args.max_size}px，无需缩放，已跳过")
+    if not scaled_files:
+        print("没有需要缩放的图片；请用 --images-dir 指定原图目录，或减小 --max-size")
+        return
+    image_files = scaled_files
+
+    print(f"测试图片: {len(image_files)} 张, 最大尺寸={args.max_size}px")
+    print("-" * 50)
+
+    base_time, draft_time, scores = run_paths(image_files, args.max_size, args.quality)
+    mean_ssim = sum(scores) / len(scores)
+
+    base_rate = len(image_files) / base_time
+    draft_rate = len(image_files) / draft_time
+
+    print(f"完整解码: {base_rate:.1f} 张/秒")
+    print(f"draft解码: {draft_rate:.1f} 张/秒 ({draft_rate / base_rate:.2f}x)")
+    print(f"SSIM(draft vs 完整): 平均 {mean_ssim:.4f}, 最低 {min(scores):.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+流水线基准测试
+生成指定规模的合成图库（合法12位编码文件名的JPEG及对应manifest），
+逐阶段计时：manifest生成、build_manifest 的各处理阶段和图片压缩，
+报告吞吐量、峰值内存（RSS），并与保存的基线对比
+
+每个阶段在独立子进程中运行，峰值RSS互不影响。有 /proc 时定期对阶段进程及其
+进程池子进程的RSS求和取峰值（共享页会重复计入，结果偏高）；否则只能报告单个进程的最大值。
+完全离线，只依赖 Pillow 和 NumPy。
+
+用法:
+    python scripts/bench_pipeline.py --count 1000                   # 生成图库并运行全部阶段
+    python scripts/bench_pipeline.py --count 1000 --save-baseline   # 保存为基线
+    python scripts/bench_pipeline.py --count 1000 --check           # 相对基线退化时返回非零
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import resource
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from batching import imap_unordered_bounded
+from generate_encoded_manifest import ENCODING_CODES
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+IMAGES_SUBDIR = Path('assets/images/pose_samples')
+MANIFEST_SUBPATH = Path('assets/images/asset_manifest.json')
+
+DEFAULT_ROOT = Path('/tmp/pose_bench')
+DEFAULT_BASELINE = SCRIPTS_DIR / 'bench_baseline.json'
+
+# 合成图片尺寸（竖图）
+IMAGE_SIZE = (480, 640)
+
+# 编码位取 'z'（未知）的概率
+UNKNOWN_RATE = 0.05
+
+
+def synthetic_name(seq, width, rng):
+    """生成合法的编码文件名"""
+    code = ''
+    for codes in ENCODING_CODES.values():
+        known = [c for c in codes if c != 'z']
+        code += 'z' if rng.random() < UNKNOWN_RATE else rng.choice(known)
+    return f'{seq:0{width}d}-{code}.jpg'
+
+
+def render_synthetic(args):
+    """渲染一张合成JPEG：渐变背景 + 色块 + 噪声，使编码和缩放开销接近真实照片"""
+    path, seed = args
+    rng = np.random.default_rng(seed)
+    width, height = IMAGE_SIZE
+    y, x = np.mgrid[0:height, 0:width]
+    base = rng.integers(0, 256, 3)
+    tilt = rng.uniform(-0.3, 0.3, 3)
+    pixels = base + (x[..., None] + y[..., None]) * tilt
+    x0, y0 = rng.integers(0, width // 2), rng.integers(0, height // 2)
+    pixels[y0:y0 + height // 2, x0:x0 + width // 3] = rng.integers(0, 256, 3)
+    pixels += rng.normal(0, 12, pixels.shape)
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, 'JPEG', quality=90)
+    return path
+
+
+def render_batch(batch):
+    return [render_synthetic(args) for args in batch]
+
+
+def generate_catalogue(root, count, workers, seed=42):
+    """在 root 下生成合成图库；已有同规模图库时直接复用，规模不同时重新生成"""
+    images_dir = root / IMAGES_SUBDIR
+    marker = root / '.catalogue.json'
+    spec = {'count': count, 'seed': seed, 'size': list(IMAGE_SIZE)}
+    if marker.exists() and json.loads(marker.read_text()) == spec:
+        print(f"复用合成图库: {images_dir} ({count} 张)")
+        return images_dir
+
+    if marker.exists():
+        shutil.rmtree(root)
+    elif root.exists() and any(root.iterdir()):
+        # 只删除本脚本生成的图库（含标记文件），避免误删 --root 指向的其他目录
+        raise SystemExit(f"{root} 不是合成图库（缺少 {marker.name}）且非空，请指定其他 --root")
+    images_dir.mkdir(parents=True)
+    # 先写入标记（规格未完成），生成中断后仍可识别为合成图库
+    marker.write_text(json.dumps({'incomplete': True}))
+
+    rng = random.Random(seed)
+    width = max(4, len(str(count)))
+    tasks = ((str(images_dir / synthetic_name(i + 1, width, rng)), seed + i) for i in range(count))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _ in imap_unordered_bounded(executor, render_batch, tasks, 32, workers * 2):
+            pass
+    print(f"生成合成图库: {count} 张 ({time.perf_counter() - start:.1f} 秒)")
+
+    marker.write_text(json.dumps(spec))
+    return images_dir
+
+
+def peak_rss_mb():
+    """本进程与已回收子进程中单个进程的最大峰值RSS（MB），不是各进程之和"""
+    scale = 1 if sys.platform == 'darwin' else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak * scale / (1024 * 1024)
+
+
+def process_tree_rss(root_pid):
+    """从 /proc 读取进程及其所有子孙进程的RSS之和（字节）"""
+    parents = {}
+    for entry in os.scandir('/proc'):
+        if entry.name.isdigit():
+            try:
+                with open(f'/proc/{entry.name}/stat', 'rb') as f:
+                    # comm 字段可能含空格，从最后一个 ')' 之后解析：state ppid ...
+                    parents[int(entry.name)] = int(f.read().rsplit(b')', 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+
+    tree = {root_pid}
+    pending = [root_pid]
+    while pending:
+        parent = pending.pop()
+        for pid, ppid in parents.items():
+            if ppid == parent and pid not in tree:
+                tree.add(pid)
+                pending.append(pid)
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in tree:
+        try:
+            with open(f'/proc/{pid}/statm', 'rb') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+def sample_tree_rss(stop, peak, interval=0.05):
+    """后台线程：每隔 interval 秒对本进程树的RSS求和，peak[0] 记录峰值（字节）"""
+    pid = os.getpid()
+    while not stop.wait(interval):
+        peak[0] = max(peak[0], process_tree_rss(pid))
+
+
+def run_with_rss(name, workers):
+    """
+    运行单个阶段并测量峰值内存
+
+    Returns:
+        字典 {seconds, items, peak_rss_mb, rss_scope}；rss_scope 为 'sum'（进程树合计）或 'max'（单进程最大）
+    """
+    if not os.path.isdir('/proc'):
+        seconds, items = run_stage(name, workers)
+        return {'seconds': seconds, 'items': items, 'peak_rss_mb': peak_rss_mb(), 'rss_scope': 'max'}
+
+    stop = threading.Event()
+    peak = [process_tree_rss(os.getpid())]
+    sampler = threading.Thread(target=sample_tree_rss, args=(stop, peak), daemon=True)
+    sampler.start()
+    try:
+        seconds, items = run_stage(name, workers)
+    finally:
+        stop.set()
+        sampler.join()
+    return {'seconds': seconds, 'items': items, 'peak_rss_mb': peak[0] / (1024 * 1024), 'rss_scope': 'sum'}
+
+
+def run_stage(name, workers):
+    """在当前进程（工作目录为图库根目录）中运行单个阶段，返回 (耗时, 处理条数)"""
+    if name == 'manifest':
+        from generate_encoded_manifest import build_records, build_manifest, write_manifest
+        # 不生成增量，每次计时一致
+        MANIFEST_SUBPATH.unlink(missing_ok=True)
+        start = time.perf_counter()
+        manifest = build_manifest(build_records(IMAGES_SUBDIR, workers=workers))
+        write_manifest(manifest, MANIFEST_SUBPATH)
+        return time.perf_counter() - start, len(manifest['files'])
+
+    if name == 'compress':
+        import compress_images
+        work_dir = Path('bench_compress')
+        if work_dir.exists():
+            shutil.rmtree(work_dir)
+        shutil.copytree(IMAGES_SUBDIR, work_dir / 'pose_samples')
+        count = len(os.listdir(work_dir / 'pose_samples'))
+        sys.argv = ['compress_images.py', '--images-dir', str(work_dir / 'pose_samples'),
+                    '--workers', str(workers), '--force']
+        start = time.perf_counter()
+        compress_images.main()
+        return time.perf_counter() - start, count
+
+    from build_manifest import run_stage as run_manifest_stage
+    # 清除各阶段的缓存与输出，测量的是完整计算而非缓存命中
+    for cache in MANIFEST_SUBPATH.parent.glob('.*_cache.json'):
+        cache.unlink()
+    shutil.rmtree(MANIFEST_SUBPATH.parent / 'atlases', ignore_errors=True)
+    with open(MANIFEST_SUBPATH, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    start = time.perf_counter()
+    run_manifest_stage(manifest, name, workers)
+    return time.perf_counter() - start, len(manifest['files'])
+
+
+def stage_names():
+    from build_manifest import STAGES
+    return ['manifest', *STAGES, 'compress']
+
+
+def measure(root, name, workers, verbose):
+    """在独立子进程中运行一个阶段并收集结果"""
+    cmd = [sys.executable, str(Path(__file__).resolve()), '--run-stage', name,
+           '--root', str(root), '--workers', str(workers)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if verbose or proc.returncode != 0:
+        print(proc.stdout, end='')
+        print(proc.stderr, end='', file=sys.stderr)
+    if proc.returncode != 0:
+        raise RuntimeError(f'阶段 {name} 运行失败')
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线比较吞吐量和峰值RSS
+
+    Returns:
+        退化的阶段列表
+    """
+    regressions = []
+    print(f"\n{'阶段':<12}{'吞吐量(张/秒)':>14}{'基线':>10}{'变化':>9}{'峰值RSS(MB)':>13}{'基线':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        line = f"{name:<12}{result['throughput']:>14.1f}"
+        if base:
+            speed = result['throughput'] / base['throughput'] - 1
+            # 统计口径不同（进程树合计/单进程最大）的RSS不做比较
+            same_scope = base.get('rss_scope', 'max') == result['rss_scope']
+            base_rss = f"{base['peak_rss_mb']:>9.1f}" if same_scope else f"{'-':>9}"
+            line += f"{base['throughput']:>10.1f}{speed * 100:>+8.1f}%{result['peak_rss_mb']:>13.1f}{base_rss}"
+            rss_regressed = same_scope and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance)
+            if speed < -tolerance or rss_regressed:
+                regressions.append(name)
+                line += '  ⚠️ 退化'
+        else:
+            line += f"{'-':>10}{'-':>9}{result['peak_rss_mb']:>13.1f}{'-':>9}"
+        print(line)
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='流水线基准测试')
+    parser.add_argument('--count', type=int, default=1000,
+                        help='合成图片数 (默认1000，建议 1k-100k)')
+    parser.add_argument('--root', type=str, default=str(DEFAULT_ROOT),
+                        help=f'合成图库目录 (默认{DEFAULT_ROOT})')
+    parser.add_argument('--stages', type=str, default=None,
+                        help='要测试的阶段，逗号分隔 (默认全部)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='并行进程/线程数 (默认CPU核数)')
+    parser.add_argument('--baseline', type=str, default=str(DEFAULT_BASELINE),
+                        help='基线文件路径')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='判定退化的相对阈值 (默认0.2)')
+    parser.add_argument('--check', action='store_true',
+                        help='有阶段退化时以非零状态退出')
+    parser.add_argument('--verbose', action='store_true',
+                        help='显示各阶段自身的输出')
+    parser.add_argument('--run-stage', type=str, default=None,
+                        help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    root = Path(args.root).resolve()
+
+    if args.run_stage:
+        # 子进程：运行单个阶段，最后一行输出JSON结果
+        os.chdir(root)
+        print(json.dumps(run_with_rss(args.run_stage, args.workers)))
+        return
+
+    available = stage_names()
+    names = available if not args.stages else [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        print(f"未知阶段: {', '.join(unknown)} (可用: {', '.join(available)})")
+        sys.exit(2)
+
+    generate_catalogue(root, args.count, args.workers)
+    if 'manifest' not in names and not (root / MANIFEST_SUBPATH).exists():
+        names.insert(0, 'manifest')
+
+    print(f"图库: {root} ({args.count} 张), 进程数: {args.workers}")
+    print("-" * 50)
+
+    results = {}
+    for name in names:
+        result = measure(root, name, args.workers, args.verbose)
+        result['throughput'] = result['items'] / result['seconds'] if result['seconds'] else 0.0
+        results[name] = result
+        scope = '进程树合计' if result['rss_scope'] == 'sum' else '单进程最大'
+        print(f"[{name}] {result['seconds']:.2f} 秒, {result['throughput']:.1f} 张/秒, "
+              f"峰值RSS {result['peak_rss_mb']:.1f} MB ({scope})")
+
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    key = str(args.count)
+    regressions = compare(results, baselines.get(key, {}).get('stages', {}), args.tolerance)
+
+    if args.save_baseline:
+        baselines[key] = {
+            'machine': f'{platform.system()} {platform.machine()}, {os.cpu_count()} CPU',
+            'python': platform.python_version(),
+            'workers': args.workers,
+            'stages': {**baselines.get(key, {}).get('stages', {}), **results},
+        }
+        baseline_path.write_text(json.dumps(baselines, ensure_ascii=False, indent=2))
+        print(f"\n基线已保存: {baseline_path}")
+
+    if regressions and args.check:
+        print(f"\n退化阶段: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
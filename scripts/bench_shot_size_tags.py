@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+景别打标基准测试
+对比原逐张实现（含 list.index 进度统计）与批量向量化实现，并校验结果一致
+"""
+
+import time
+import random
+import argparse
+from pathlib import Path
+
+from add_shot_size_tags import (SHOT_SIZE_BIAS, SHOT_SIZES, assign_shot_sizes,
+                                get_shot_size_by_category, shot_size_seed)
+
+
+def make_records(count, seed=42):
+    """生成带分类的合成记录（含无服装类型的分类）"""
+    rng = random.Random(seed)
+    categories = [f'{style}_{wear}' for style in ('edgy_style', 'vintage_style', 'minimalist')
+                  for wear in SHOT_SIZE_BIAS] + ['', 'street_style']
+    return [{'asset_path': f'assets/images/pose_samples/{i:05d}-{rng.randrange(16 ** 6):06x}.jpg',
+             'category': rng.choice(categories)} for i in range(count)]
+
+
+def legacy_assign(files):
+    """原实现：逐张新建 Random，并用 list.index 计算进度"""
+    result = []
+    for item in files:
+        category = item.get('category', '')
+        filename = Path(item['asset_path']).name
+        rng = random.Random(shot_size_seed(category, filename))
+        result.append(get_shot_size_by_category(category, filename, rng))
+        if (list(files).index(item) + 1) % 500 == 0:
+            pass
+    return result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='景别打标基准测试')
+    parser.add_argument('--count', type=int, default=13938,
+                        help='合成记录数 (默认13938)')
+
+    args = parser.parse_args()
+
+    files = make_records(args.count)
+
+    start = time.perf_counter()
+    legacy = legacy_assign(files)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indices = assign_shot_sizes([f['category'] for f in files],
+                                [Path(f['asset_path']).name for f in files])
+    batched = [SHOT_SIZES[i] for i in indices.tolist()]
+    batched_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy, batched) if a != b)
+
+    print(f"记录数: {len(files)}")
+    print("-" * 50)
+    print(f"原实现: {legacy_time:.3f} 秒")
+    print(f"批量实现: {batched_time:.3f} 秒 ({legacy_time / batched_time:.1f}x)")
+    print(f"结果不一致: {mismatches} 条")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+12位编码的倒排位图索引（asset_manifest.idx）
+每个 (编码位, 代码) 对应一个按图片序号排列的位图，以游程编码压缩存储；
+多条件筛选只需少量位与/位或运算
+
+文件布局（小端）:
+    头部  魔数 'POZI', 版本(u16), 图片数(u32), 编码位数(u8)
+    每个编码位: 名称(长度前缀UTF-8), 代码数(u8)
+        每个代码: 代码(ASCII 1字节), 数据长度(u32), 游程数据
+    游程数据为LEB128变长整数序列，从0游程开始，0/1游程交替
+
+用法:
+    python scripts/bitmap_index.py [assets/images/asset_manifest.idx]
+"""
+
+import struct
+import sys
+from itertools import groupby
+from pathlib import Path
+
+from atomic_io import write_atomic
+
+MAGIC = b'POZI'
+FORMAT_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sHIB')
+
+
+def build_index(files, positions):
+    """
+    构建倒排位图
+
+    Args:
+        files: manifest 的 files 列表（含 full_code），列表下标即图片序号
+        positions: 编码位名称，顺序与 full_code 一致
+
+    Returns:
+        字典 {编码位: {代码: 位图(int)}}
+    """
+    ordinals = {position: {} for position in positions}
+    for i, f in enumerate(files):
+        for position, code in zip(positions, f['full_code']):
+            ordinals[position].setdefault(code, []).append(i)
+
+    size = (len(files) + 7) // 8
+    index = {}
+    for position, codes in ordinals.items():
+        index[position] = {}
+        for code, members in sorted(codes.items()):
+            bitmap = bytearray(size)
+            for i in members:
+                bitmap[i >> 3] |= 1 << (i & 7)
+            index[position][code] = int.from_bytes(bitmap, 'little')
+    return index
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, offset):
+    value = shift = 0
+    while True:
+        byte = buf[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_runs(bitmap, count):
+    """将位图编码为交替的0/1游程"""
+    bits = format(bitmap, f'0{count}b')[::-1] if count else ''
+    out = bytearray()
+    expected = '0'
+    for bit, run in groupby(bits):
+        if bit != expected:
+            # 位图以1开头时补一个长度为0的0游程
+            _write_varint(out, 0)
+        _write_varint(out, sum(1 for _ in run))
+        expected = '1' if bit == '0' else '0'
+    return bytes(out)
+
+
+def decode_runs(data):
+    """由游程数据还原位图"""
+    bitmap = 0
+    pos = offset = 0
+    ones = False
+    while offset < len(data):
+        run, offset = _read_varint(data, offset)
+        if ones:
+            bitmap |= ((1 << run) - 1) << pos
+        pos += run
+        ones = not ones
+    return bitmap
+
+
+def write_index(path, index, count):
+    """写入位图索引文件"""
+    out = bytearray(HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, count, len(index)))
+    for position, codes in index.items():
+        name = position.encode('utf-8')
+        out.append(len(name))
+        out += name
+        out.append(len(codes))
+        for code, bitmap in codes.items():
+            runs = encode_runs(bitmap, count)
+            out += code.encode('ascii')
+            out += struct.pack('<I', len(runs))
+            out += runs
+
+    write_atomic(path, bytes(out))
+
+
+def read_index(path):
+    """
+    读取位图索引文件
+
+    Returns:
+        元组 (图片数, {编码位: {代码: 位图}})
+    """
+    buf = Path(path).read_bytes()
+    magic, version, count, n_positions = HEADER_STRUCT.unpack_from(buf, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f'不支持的位图索引: {path}')
+
+    offset = HEADER_STRUCT.size
+    index = {}
+    for _ in range(n_positions):
+        length = buf[offset]
+        position = buf[offset + 1:offset + 1 + length].decode('utf-8')
+        offset += 1 + length
+        n_codes = buf[offset]
+        offset += 1
+        codes = {}
+        for _ in range(n_codes):
+            code = chr(buf[offset])
+            (length,) = struct.unpack_from('<I', buf, offset + 1)
+            offset += 5
+            codes[code] = decode_runs(buf[offset:offset + length])
+            offset += length
+        index[position] = codes
+    return count, index
+
+
+def query(index, count, criteria):
+    """
+    多条件筛选：同一编码位的多个代码取并集，不同编码位之间取交集
+
+    Args:
+        index: build_index/read_index 得到的位图索引
+        count: 图片数
+        criteria: {编码位: 代码 或 代码列表}
+
+    Returns:
+        匹配图片的序号列表（升序）
+    """
+    result = (1 << count) - 1
+    for position, codes in criteria.items():
+        if isinstance(codes, str):
+            codes = [codes]
+        union = 0
+        for code in codes:
+            union |= index[position].get(code, 0)
+        result &= union
+        if not result:
+            return []
+    return bitmap_ordinals(result)
+
+
+def bitmap_ordinals(bitmap):
+    """位图中置位的序号列表"""
+    ordinals = []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            ordinals.append(byte_index * 8 + low.bit_length() - 1)
+            byte ^= low
+    return ordinals
+
+
+if __name__ == '__main__':
+    idx_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'assets/images/asset_manifest.idx')
+    total, bitmaps = read_index(idx_path)
+    print(f"{idx_path}: {total} 张图片, {idx_path.stat().st_size} 字节")
+    for position, codes in bitmaps.items():
+        counts = ', '.join(f"{code}={bin(bitmap).count('1')}" for code, bitmap in codes.items())
+        print(f"  {position}: {counts}")
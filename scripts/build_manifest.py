@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+单次构建 asset_manifest.json
+将编码解析与各打标脚本合并为一条流水线：记录只读取一次，
+各阶段在内存中依次处理，最后原子写出一次
+
+用法:
+    python scripts/build_manifest.py                      # 扫描图片并运行默认阶段
+    python scripts/build_manifest.py --stages shot_size   # 只运行指定阶段
+    python scripts/build_manifest.py --stages all         # 运行全部阶段（含解码图片的阶段）
+    python scripts/build_manifest.py --input assets/images/asset_manifest.json
+    python scripts/build_manifest.py --migrate            # 只报告相对现有manifest的变化
+"""
+
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import Counter, namedtuple
+
+from generate_encoded_manifest import build_records, build_manifest, write_manifest
+from add_shot_size_tags import apply_shot_size_tags
+from generate_pose_tags import apply_pose_tags
+from update_simple_tags import apply_simple_tags
+from placeholders import apply_placeholders
+from color_tags import apply_color_analysis
+from pack_atlases import apply_atlases
+import tracing
+from tracing import span
+
+# 处理阶段：default 为 False 的阶段需通过 --stages 显式选择；
+# parallel 为 True 的阶段接受 workers 参数（进程池大小）
+Stage = namedtuple('Stage', ['description', 'func', 'default', 'parallel'])
+
+# 已注册的阶段：{名称: Stage}，按原脚本的执行顺序排列
+STAGES = {}
+
+
+def register_stage(name, description, func, default=True, parallel=False):
+    """注册一个处理阶段，func 接收manifest字典并原地修改其 files"""
+    STAGES[name] = Stage(description, func, default, parallel)
+
+
+register_stage('shot_size', '景别标签 (add_shot_size_tags)', apply_shot_size_tags)
+# simple_tags 会删除 pose_tags，默认构建中运行只是白费
+register_stage('pose_tags', '姿势标签 (generate_pose_tags)', apply_pose_tags, default=False)
+register_stage('simple_tags', '简化标签 (update_simple_tags)', apply_simple_tags)
+# 以下阶段需要解码图片，耗时远超其余阶段
+register_stage('placeholder', 'BlurHash占位图 (placeholders)', apply_placeholders,
+               default=False, parallel=True)
+register_stage('color', '内容主色分析 (color_tags)', apply_color_analysis, default=False, parallel=True)
+register_stage('atlas', '缩略图图集 (pack_atlases)', apply_atlases, default=False, parallel=True)
+
+DEFAULT_STAGES = [name for name, stage in STAGES.items() if stage.default]
+
+
+def run_stage(manifest, name, workers):
+    """运行单个阶段"""
+    stage = STAGES[name]
+    if stage.parallel:
+        return stage.func(manifest, workers=workers)
+    return stage.func(manifest)
+
+
+def run_pipeline(manifest, stage_names, workers=8):
+    """
+    依次运行各阶段
+
+    Returns:
+        {阶段名: 耗时秒数}
+    """
+    timings = {}
+    for name in stage_names:
+        print(f"[{name}] {STAGES[name].description}")
+        start = time.perf_counter()
+        run_stage(manifest, name, workers)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def diff_records(old_files, new_files):
+    """
+    按文件名比较两组记录
+
+    Returns:
+        字典 {added, removed, changed, fields: {字段: 变化记录数}}
+    """
+    old_by_name = {f['filename']: f for f in old_files}
+    new_by_name = {f['filename']: f for f in new_files}
+
+    report = {
+        'added': len(new_by_name.keys() - old_by_name.keys()),
+        'removed': len(old_by_name.keys() - new_by_name.keys()),
+        'changed': 0,
+        'fields': Counter(),
+    }
+    for name in new_by_name.keys() & old_by_name.keys():
+        old, new = old_by_name[name], new_by_name[name]
+        fields = [key for key in old.keys() | new.keys() if old.get(key) != new.get(key)]
+        if fields:
+            report['changed'] += 1
+            report['fields'].update(fields)
+    return report
+
+
+def print_migration_report(output_path, manifest):
+    """报告本次构建相对现有manifest会改变多少条记录"""
+    if not output_path.exists():
+        print(f"未找到现有manifest: {output_path}")
+        return
+    with open(output_path, 'r', encoding='utf-8') as f:
+        existing = json.load(f)
+
+    report = diff_records(existing.get('files', []), manifest['files'])
+    print(f"迁移报告（相对 {output_path}，未写入）:")
+    print(f"  新增: {report['added']} 条")
+    print(f"  删除: {report['removed']} 条")
+    print(f"  变化: {report['changed']} 条")
+    for field, count in report['fields'].most_common():
+        print(f"    {field}: {count} 条")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='单次构建manifest')
+    parser.add_argument('--input', type=str, default=None,
+                        help='从已有JSON manifest开始（默认扫描图片文件名重新生成）')
+    parser.add_argument('--output', type=str, default='assets/images/asset_manifest.json',
+                        help='输出路径 (默认assets/images/asset_manifest.json)')
+    parser.add_argument('--stages', type=str, default=','.join(DEFAULT_STAGES),
+                        help=f'要运行的阶段，逗号分隔，all 表示全部 '
+                             f'(默认: {",".join(DEFAULT_STAGES)}; 可用: {",".join(STAGES)})')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='读取图片头信息的线程数，及各阶段的并行进程数 (默认8)')
+    parser.add_argument('--migrate', action='store_true',
+                        help='迁移模式：只报告相对现有输出会变化的记录数，不写入')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='将逐张/逐阶段耗时写入JSON-lines追踪文件，结束时打印汇总')
+    parser.add_argument('--profile', action='store_true',
+                        help='与 --trace 同用：为每个进程开启 cProfile 和 tracemalloc')
+
+    args = parser.parse_args()
+
+    if args.trace:
+        tracing.enable(args.trace, args.profile)
+
+    stage_names = [name.strip() for name in args.stages.split(',') if name.strip()]
+    if stage_names == ['all']:
+        stage_names = list(STAGES)
+    unknown = [name for name in stage_names if name not in STAGES]
+    if unknown:
+        print(f"未知阶段: {', '.join(unknown)} (可用: {', '.join(STAGES)})")
+        return
+
+    start = time.perf_counter()
+    if args.input:
+        with span('json_load', args.input), open(args.input, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    else:
+        manifest = build_manifest(build_records(workers=args.workers))
+    load_time = time.perf_counter() - start
+
+    print(f"读取 {len(manifest['files'])} 条记录 ({load_time:.2f} 秒)")
+    print("-" * 50)
+
+    timings = run_pipeline(manifest, stage_names, args.workers)
+
+    output_path = Path(args.output)
+    if args.migrate:
+        print("-" * 50)
+        print_migration_report(output_path, manifest)
+        return
+
+    start = time.perf_counter()
+    write_manifest(manifest, output_path)
+    write_time = time.perf_counter() - start
+
+    print("-" * 50)
+    for name, seconds in timings.items():
+        print(f"  {name}: {seconds:.2f} 秒")
+    print(f"  写出: {write_time:.2f} 秒")
+    print(f"已保存到: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+基于图片内容的主色分析（第9位 color）
+在缩小后的画面中心区域做 Lab 空间 k-means，取占比最大的颜色簇映射到
+ENCODING_CODES['color'] 的 a-n；结果写入 color_analysis 字段并报告与现有
+编码的一致率，不会覆盖文件名中的编码
+
+用法:
+    python scripts/color_tags.py [--workers 8]
+"""
+
+import json
+import argparse
+from pathlib import Path
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+from atomic_io import write_json
+from image_io import load_resized
+from content_cache import compute_cached, params_key
+from generate_encoded_manifest import ENCODING_CODES
+from tracing import span, traced
+
+# 各颜色代码的参考 sRGB 值（'l' 多彩/印花 由簇分布判断，不参与最近色匹配）
+REFERENCE_COLORS = {
+    'a': (25, 25, 25),      # 黑色
+    'b': (240, 240, 236),   # 白色
+    'c': (128, 128, 128),   # 灰色
+    'd': (190, 30, 45),     # 红色
+    'e': (45, 95, 185),     # 蓝色
+    'f': (45, 135, 65),     # 绿色
+    'g': (230, 200, 50),    # 黄色
+    'h': (235, 160, 180),   # 粉色
+    'i': (125, 65, 160),    # 紫色
+    'j': (115, 75, 45),     # 棕色
+    'k': (235, 130, 40),    # 橙色
+    'm': (220, 200, 165),   # 米色
+    'n': (30, 40, 80),      # 藏青
+}
+
+MULTI_COLOR_CODE = 'l'
+
+# 分析时的解码尺寸（最大边长）与中心区域（服装通常位于画面中部）
+SAMPLE_SIZE = 64
+CENTER_BOX = (0.25, 0.2, 0.75, 0.85)
+
+# k-means 簇数与迭代次数
+CLUSTERS = 4
+ITERATIONS = 12
+
+# 判定为多彩：至少3个簇各占比不低于该值，且对应不同的有彩色
+MULTI_COLOR_SHARE = 0.2
+
+CACHE_PATH = Path('assets/images/.color_cache.json')
+
+# 算法版本，修改计算方式时递增使缓存失效
+COLOR_VERSION = 1
+
+
+def srgb_to_lab(rgb):
+    """(…, 3) sRGB(0-255) 转 CIE Lab（D65）"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ np.array([[0.4124564, 0.2126729, 0.0193339],
+                             [0.3575761, 0.7151522, 0.1191920],
+                             [0.1804375, 0.0721750, 0.9503041]])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+REFERENCE_CODES = list(REFERENCE_COLORS)
+REFERENCE_LAB = srgb_to_lab(list(REFERENCE_COLORS.values()))
+
+# 无彩色（参与多彩判断时忽略）
+NEUTRAL_CODES = {'a', 'b', 'c', 'm'}
+
+
+def kmeans(points, k=CLUSTERS, iterations=ITERATIONS, seed=0):
+    """
+    向量化 k-means（k-means++ 初始化）
+
+    Returns:
+        元组 (簇中心 k×3, 每簇点数)
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(points))
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = ((points[:, None, :] - np.array(centers)[None]) ** 2).sum(-1).min(1)
+        total = d2.sum()
+        probs = d2 / total if total > 0 else None
+        centers.append(points[rng.choice(len(points), p=probs)])
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        labels = ((points[:, None, :] - centers[None]) ** 2).sum(-1).argmin(1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points)
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(moved, centers):
+            break
+        centers = moved
+
+    labels = ((points[:, None, :] - centers[None]) ** 2).sum(-1).argmin(1)
+    return centers, np.bincount(labels, minlength=k)
+
+
+def nearest_codes(lab_centers):
+    """把 Lab 簇中心映射到最近的参考颜色代码（ΔE76）"""
+    distances = ((lab_centers[:, None, :] - REFERENCE_LAB[None]) ** 2).sum(-1)
+    return [REFERENCE_CODES[i] for i in distances.argmin(1)]
+
+
+def dominant_color(img_path):
+    """
+    分析单张图片的主色
+
+    Returns:
+        字典 {code, share}
+    """
+    with Image.open(img_path) as img:
+        small = load_resized(img, SAMPLE_SIZE, draft=True).convert('RGB')
+    width, height = small.size
+    left, top, right, bottom = CENTER_BOX
+    crop = small.crop((int(width * left), int(height * top),
+                       max(int(width * right), 1), max(int(height * bottom), 1)))
+
+    with span('kmeans', img_path):
+        points = srgb_to_lab(np.asarray(crop).reshape(-1, 3))
+        centers, counts = kmeans(points)
+    shares = counts / counts.sum()
+    codes = nearest_codes(centers)
+
+    chromatic = {code for code, share in zip(codes, shares)
+                 if share >= MULTI_COLOR_SHARE and code not in NEUTRAL_CODES}
+    if len(chromatic) >= 3:
+        return {'code': MULTI_COLOR_CODE, 'share': round(float(shares.max()), 3)}
+
+    best = int(shares.argmax())
+    return {'code': codes[best], 'share': round(float(shares[best]), 3)}
+
+
+def cache_key():
+    """缓存签名：参考色、采样区域与聚类参数任一变化都会重新分析"""
+    return params_key({
+        'version': COLOR_VERSION,
+        'reference': REFERENCE_COLORS,
+        'neutral': sorted(NEUTRAL_CODES),
+        'sample_size': SAMPLE_SIZE,
+        'center_box': CENTER_BOX,
+        'clusters': CLUSTERS,
+        'iterations': ITERATIONS,
+        'multi_color_share': MULTI_COLOR_SHARE,
+    })
+
+
+def agreement_report(files):
+    """统计分析结果与文件名中颜色编码的一致情况"""
+    agree = total = 0
+    filled = 0
+    confusion = Counter()
+    for item in files:
+        analysis = item.get('color_analysis')
+        if not analysis:
+            continue
+        existing = item['encoding']['color']['code']
+        if existing == 'z' or existing not in ENCODING_CODES['color']:
+            filled += 1
+            continue
+        total += 1
+        if existing == analysis['code']:
+            agree += 1
+        else:
+            confusion[(existing, analysis['code'])] += 1
+    return {'agree': agree, 'total': total, 'unknown_filled': filled, 'confusion': confusion}
+
+
+@traced('color')
+def apply_color_analysis(data, workers=8, chunksize=32, cache_path=CACHE_PATH):
+    """
+    为内存中的manifest添加 color_analysis 字段并打印一致率
+
+    按 content_hash 缓存结果，未变化的图片不会重复分析；算法参数变化时缓存整体失效。
+    """
+    files = data.get('files', [])
+    cache, _ = compute_cached(files, dominant_color, cache_path, cache_key(), '分析主色',
+                              workers, chunksize)
+
+    names = ENCODING_CODES['color']
+    for item in files:
+        result = cache.get(item.get('content_hash'))
+        if result:
+            item['color_analysis'] = dict(result, name=names[result['code']])
+
+    report = agreement_report(files)
+    if report['total']:
+        rate = report['agree'] / report['total'] * 100
+        print(f"  与现有颜色编码一致: {report['agree']}/{report['total']} ({rate:.1f}%)")
+    print(f"  现有编码未知、可补充: {report['unknown_filled']} 张")
+    for (existing, suggested), count in report['confusion'].most_common(5):
+        print(f"    {names[existing]} -> {names[suggested]}: {count} 张")
+    return report
+
+
+def main():
+    """主函数：为现有 asset_manifest.json 添加主色分析"""
+    parser = argparse.ArgumentParser(description='基于内容的主色分析')
+    parser.add_argument('--manifest', type=str, default='assets/images/asset_manifest.json',
+                        help='manifest路径')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='并行处理进程数 (默认8)')
+
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    apply_color_analysis(data, workers=args.workers)
+    write_json(manifest_path, data, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,120 +5,670 @@
 """
 
 import os
+import json
+import time
+from io import BytesIO
 from pathlib import Path
 from PIL import Image
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 import argparse
 
+from atomic_io import write_atomic, write_json
+from batching import imap_unordered_bounded
+from image_io import (CODECS, IMAGE_EXTENSIONS, DERIVATIVE_SPECS, DERIVED_DIRNAME,
+                      file_digest, load_resized, encode_image)
+from image_metrics import ssim, decode_bytes
+import tracing
+from tracing import span
+
+# 自动调优时的最低质量
+MIN_QUALITY = 30
+
+# 增量压缩状态文件版本
+STATE_VERSION = 1
+
+# 默认状态文件名（位于图片目录的上级，避免被打包进应用资源）
+STATE_FILENAME = '.compress_state.json'
+
+
+def journal_path(state_path):
+    """状态文件对应的追加式日志（记录上次保存状态后完成的每张图片）"""
+    return Path(f'{state_path}.journal')
+
+
+def append_journal(path, record):
+    """
+    追加一行日志
+
+    以 O_APPEND 打开并用一次 write 写入整行，多个工作进程并发追加时各行不会交错；
+    写入返回后即使所有进程被强制结束，这一行也会保留。
+    """
+    line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def journal_records(state_path):
+    """
+    逐条读取日志记录
+
+    进程被强制结束时最后一行可能不完整，解析失败的行直接跳过。
+    """
+    try:
+        with open(journal_path(state_path), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+
+
+def read_journal(state_path):
+    """
+    读取日志中已完成的条目
+
+    Returns:
+        字典 {文件名: 状态条目}
+    """
+    return {record['file']: record['entry'] for record in journal_records(state_path) if 'entry' in record}
+
+
+def read_journal_failures(state_path):
+    """
+    读取日志中失败图片的异常信息
+
+    Returns:
+        字典 {文件名: 异常信息}
+    """
+    return {record['file']: record['error'] for record in journal_records(state_path) if 'error' in record}
+
+
+def interrupted_replacements(state_path):
+    """
+    日志中新格式已写入、但原图尚未删除的更换格式记录
+
+    工作进程写入新格式后、删除原图前追加 {replacing: 原图, with: 新文件, written: [大小, 修改时间]}；
+    新文件仍与 written 一致，说明它正是那次写入的完整文件。
+
+    Returns:
+        记录列表
+    """
+    pending = []
+    for record in journal_records(state_path):
+        if 'replacing' not in record:
+            continue
+        try:
+            st = os.stat(record['with'])
+        except OSError:
+            continue
+        if [st.st_size, st.st_mtime_ns] == record['written'] and os.path.exists(record['replacing']):
+            pending.append(record)
+    return pending
+
+
+def load_state(state_path):
+    """
+    读取增量压缩状态（含未合并的日志）
+
+    Returns:
+        字典 {文件名: {size, mtime_ns, hash, quality, max_size}}
+    """
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {'version': STATE_VERSION}
+
+    entries = data.get('files', {}) if data.get('version') == STATE_VERSION else {}
+    entries.update(read_journal(state_path))
+    return entries
+
+
+def save_state(state_path, entries, failures=None):
+    """
+    原子写入增量压缩状态，写入成功后清空日志
+
+    尚未清理的更换格式记录保留在日志中，留给下次 --replace-format 运行处理。
+    """
+    write_json(state_path, {'version': STATE_VERSION, 'files': entries, 'failures': failures or {}},
+               sort_keys=True)
+    clear_journal(state_path)
+
+
+def clear_journal(state_path):
+    """清空日志，只保留尚未清理的更换格式记录"""
+    pending = interrupted_replacements(state_path)
+    if pending:
+        write_atomic(journal_path(state_path),
+                     b''.join((json.dumps(r, ensure_ascii=False) + '\n').encode('utf-8') for r in pending))
+    else:
+        journal_path(state_path).unlink(missing_ok=True)
+
+
+def remove_stale_temp(images_dir):
+    """删除上次中断遗留的临时文件，返回删除数"""
+    extensions = set(IMAGE_EXTENSIONS) | {codec['ext'] for codec in CODECS.values()}
+    stale = [p for p in images_dir.glob('*.tmp') if Path(p.stem).suffix.lower() in extensions]
+    for path in stale:
+        path.unlink()
+    return len(stale)
+
+
+def remove_replaced_originals(state_path):
+    """
+    删除更换编码格式时中断遗留的原图
+
+    只处理日志中有更换记录、且新格式已完整写入的原图；
+    同名不同格式的其他文件一律不动。
+
+    Returns:
+        删除的文件路径列表
+    """
+    removed = []
+    for record in interrupted_replacements(state_path):
+        os.remove(record['replacing'])
+        removed.append(record['replacing'])
+    return removed
+
+
+def available_codecs():
+    """
+    返回当前 Pillow 支持写入的编码器名称
+
+    AVIF 需要 Pillow 内置支持或安装 pillow-avif-plugin。
+    """
+    try:
+        import pillow_avif  # noqa: F401  注册AVIF插件
+    except ImportError:
+        pass
+    Image.init()
+    return [name for name, codec in CODECS.items() if codec['format'] in Image.SAVE]
+
+
+def list_images(images_dir):
+    """列出目录中所有支持格式的图片"""
+    return sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def meets_target(entry, quality, max_size, codecs=('jpeg',)):
+    """
+    判断上次的压缩参数是否已满足目标
+
+    质量更低、尺寸更小的结果再次编码不会变好，只会继续损失画质，
+    因此只有目标比上次更严格或编码器不在候选列表中时才需要重新压缩。
+    """
+    if entry.get('codec', 'jpeg') not in codecs:
+        return False
+    last_max = entry.get('max_size') or 0
+    if max_size and (not last_max or last_max > max_size):
+        return False
+    return entry.get('quality', 101) <= quality
+
+
+def is_up_to_date(img_path, entry, quality, max_size, codecs=('jpeg',)):
+    """
+    检查图片是否可以跳过
+
+    先比较大小和修改时间（无需读取文件）；仅当大小相同而修改时间
+    变化时才计算内容哈希。
+
+    Returns:
+        元组 (是否跳过, 更新后的状态条目或None)
+    """
+    if not entry or not meets_target(entry, quality, max_size, codecs):
+        return False, None
+
+    st = os.stat(img_path)
+    if st.st_size != entry.get('size'):
+        return False, None
+    if st.st_mtime_ns == entry.get('mtime_ns'):
+        return True, entry
+
+    # 文件被touch过但内容未变：刷新修改时间
+    if file_digest(img_path) == entry.get('hash'):
+        return True, dict(entry, mtime_ns=st.st_mtime_ns)
+    return False, None
+
+
+def search_quality(img, codec, max_quality, target_ssim, min_quality=MIN_QUALITY):
+    """
+    二分查找满足 SSIM 阈值的最低质量
+
+    SSIM 随质量单调上升，因此约 log2(max_quality - min_quality) 次编码
+    即可确定结果；即使最高质量也达不到阈值时使用 max_quality。
+
+    Returns:
+        元组 (质量, 编码数据)
+    """
+    best_quality = max_quality
+    best_data = encode_image(img, codec, max_quality)
+
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        mid = (low + high) // 2
+        data = encode_image(img, codec, mid)
+        if ssim(img, decode_bytes(data)) >= target_ssim:
+            best_quality, best_data = mid, data
+            high = mid - 1
+        else:
+            low = mid + 1
+
+    return best_quality, best_data
+
 
 def compress_image(args):
     """
     压缩单张图片
 
+    对每个候选编码器编码（可按 SSIM 阈值自动选择质量），保留体积最小的
+    结果；编码器扩展名不同时写入新文件并删除原图（需 replace_format，
+    删除前先在日志中记录更换，中断遗留的原图由 remove_replaced_originals 清理）。
+
     Args:
-        args: 元组 (图片路径, 目标质量, 最大尺寸)
+        args: 元组 (图片路径, 压缩参数字典)
+            压缩参数: quality, max_size, draft, codecs, target_ssim, replace_format,
+                      journal（日志路径，写入完成后立即追加该图片的记录）
 
     Returns:
-        元组 (图片路径, 原始大小, 压缩后大小, 是否成功)
+        元组 (输出路径, 原始大小, 压缩后大小, 是否成功, 状态条目, {编码器: 编码耗时})
+        失败时状态条目为 {'error': 异常信息}
     """
-    img_path, quality, max_size = args
+    img_path, options = args
+    quality = options['quality']
+    max_size = options['max_size']
+    target_ssim = options.get('target_ssim')
+    encode_times = {}
 
     try:
         # 获取原始文件大小
         original_size = os.path.getsize(img_path)
 
         # 打开图片
-        with Image.open(img_path) as img:
-            # 转换为RGB模式（处理RGBA或其他模式）
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-
-            # 检查是否需要调整尺寸
-            width, height = img.size
-            if max_size and (width > max_size or height > max_size):
-                # 按比例缩放
-                ratio = min(max_size / width, max_size / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # 保存压缩后的图片
-            img.save(img_path, 'JPEG', quality=quality, optimize=True)
+        with span('compress', img_path, original_size) as record, Image.open(img_path) as img:
+            img = load_resized(img, max_size, options.get('draft', False))
+
+            # 逐个编码器编码，保留体积最小的结果
+            best = None
+            suffix = Path(img_path).suffix.lower()
+            # 更换格式时不覆盖已存在的同名其他格式文件
+            codecs = [codec for codec in options.get('codecs', ('jpeg',))
+                      if CODECS[codec]['ext'] == suffix
+                      or (options.get('replace_format')
+                          and not Path(img_path).with_suffix(CODECS[codec]['ext']).exists())]
+            if not codecs:
+                raise ValueError(f'候选编码器均需更换格式或会覆盖同名文件: {suffix}')
+            for codec in codecs:
+                start = time.perf_counter()
+                if target_ssim:
+                    codec_quality, data = search_quality(img, codec, quality, target_ssim)
+                else:
+                    codec_quality, data = quality, encode_image(img, codec, quality)
+                encode_times[codec] = time.perf_counter() - start
+
+                if best is None or len(data) < len(best[2]):
+                    best = (codec, codec_quality, data)
+            record['bytes_out'] = len(best[2])
+
+        codec, codec_quality, data = best
+        out_path = str(Path(img_path).with_suffix(CODECS[codec]['ext']))
+
+        # 先写临时文件再原子替换，进程中断不会留下写了一半的图片
+        with span('write', out_path) as record:
+            write_atomic(out_path, data)
+            record['bytes_out'] = len(data)
 
         # 获取压缩后大小
-        compressed_size = os.path.getsize(img_path)
+        st = os.stat(out_path)
+        compressed_size = st.st_size
+
+        # 先记录更换再删除原图，中断时由 remove_replaced_originals 完成删除
+        if out_path != img_path:
+            if options.get('journal'):
+                append_journal(options['journal'], {'replacing': os.path.abspath(img_path),
+                                                    'with': os.path.abspath(out_path),
+                                                    'written': [st.st_size, st.st_mtime_ns]})
+            os.remove(img_path)
+
+        entry = {
+            'size': compressed_size,
+            'mtime_ns': st.st_mtime_ns,
+            'hash': file_digest(out_path),
+            'codec': codec,
+            'quality': codec_quality,
+            'max_size': max_size,
+        }
+        if options.get('journal'):
+            append_journal(options['journal'], {'file': Path(out_path).name, 'entry': entry})
+
+        return (out_path, original_size, compressed_size, True, entry, encode_times)
+
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        if options.get('journal'):
+            append_journal(options['journal'], {'file': Path(img_path).name, 'error': error})
+        return (img_path, 0, 0, False, {'error': error}, encode_times)
+
+
+def derivative_paths(img_path, out_root):
+    """获取源图片对应的各规格衍生图路径"""
+    name = Path(img_path).stem + '.jpg'
+    return {kind: Path(out_root) / kind / name for kind in DERIVATIVE_SPECS}
+
+
+def derivatives_up_to_date(img_path, out_root):
+    """衍生图均存在且不早于源图时可跳过"""
+    src_mtime = os.stat(img_path).st_mtime_ns
+    for path in derivative_paths(img_path, out_root).values():
+        try:
+            if os.stat(path).st_mtime_ns < src_mtime:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def make_derivatives(args):
+    """
+    一次解码生成所有规格的衍生图（缩略图 + 大图），不修改源图
 
-        return (img_path, original_size, compressed_size, True)
+    先按最大规格解码并缩放，较小规格从该中间结果继续缩放，
+    避免重复解码原图。
+
+    Args:
+        args: 元组 (图片路径, 输出根目录, 目标质量, 是否启用draft解码)
+
+    Returns:
+        元组 (图片路径, 原始大小, 衍生图总大小, 是否成功, None或{'error': 异常信息}, {})
+    """
+    img_path, out_root, quality, draft = args
+
+    try:
+        original_size = os.path.getsize(img_path)
+        paths = derivative_paths(img_path, out_root)
+
+        # 按面积从大到小处理
+        kinds = sorted(DERIVATIVE_SPECS, key=lambda k: DERIVATIVE_SPECS[k][0] * DERIVATIVE_SPECS[k][1],
+                       reverse=True)
+
+        derived_size = 0
+        with span('derive', img_path, original_size) as record, Image.open(img_path) as img:
+            current = load_resized(img, DERIVATIVE_SPECS[kinds[0]], draft)
+            for kind in kinds:
+                current = load_resized(current, DERIVATIVE_SPECS[kind])
+                paths[kind].parent.mkdir(parents=True, exist_ok=True)
+                with span(f'write_{kind}', paths[kind]):
+                    buf = BytesIO()
+                    current.save(buf, 'JPEG', quality=quality, optimize=True)
+                    write_atomic(paths[kind], buf.getvalue())
+                derived_size += os.path.getsize(paths[kind])
+            record['bytes_out'] = derived_size
+
+        return (img_path, original_size, derived_size, True, None, {})
 
     except Exception as e:
-        return (img_path, 0, 0, False)
+        return (img_path, 0, 0, False, {'error': f'{type(e).__name__}: {e}'}, {})
+
+
+def derive_batch(batch):
+    """批量生成衍生图"""
+    return [make_derivatives(args) for args in batch]
+
+
+def compress_batch(batch):
+    """压缩一批图片，减少进程间调度与序列化次数"""
+    return [compress_image(args) for args in batch]
+
+
+def run_derivatives(args, image_files, out_root):
+    """衍生图模式：为每张源图生成缩略图和大图，源图保持不变"""
+    pending = image_files if args.force else [
+        img for img in image_files if not derivatives_up_to_date(img, out_root)
+    ]
+    skipped_count = len(image_files) - len(pending)
+
+    specs = ', '.join(f"{kind}={w}x{h}" for kind, (w, h) in DERIVATIVE_SPECS.items())
+    print(f"找到 {len(image_files)} 张图片")
+    print(f"衍生图规格: {specs}, 质量={args.quality}")
+    print(f"输出目录: {out_root}")
+    print(f"已是最新: {skipped_count} 张, 待生成: {len(pending)} 张")
+    print("-" * 50)
+
+    if args.dry_run:
+        print("试运行模式 - 不执行实际生成")
+        return
+
+    total_tasks = len(pending)
+    task_args = ((str(img), str(out_root), args.quality, args.draft) for img in pending)
+
+    total_original = 0
+    total_derived = 0
+    success_count = 0
+    failed_count = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = imap_unordered_bounded(executor, derive_batch, task_args,
+                                         max(1, args.chunksize), args.workers * 2)
+
+        for i, (img_path, original_size, derived_size, success, error, _) in enumerate(results):
+            if success:
+                total_original += original_size
+                total_derived += derived_size
+                success_count += 1
+            else:
+                failed_count += 1
+                print(f"失败: {img_path} ({error['error']})")
+
+            if (i + 1) % 100 == 0 or (i + 1) == total_tasks:
+                progress = (i + 1) / total_tasks * 100
+                print(f"进度: {progress:.1f}% ({i + 1}/{total_tasks})")
+
+    print("-" * 50)
+    print("衍生图生成完成!")
+    print(f"成功: {success_count} 张")
+    print(f"跳过: {skipped_count} 张")
+    print(f"失败: {failed_count} 张")
+    if total_original > 0:
+        print(f"\n源图大小: {total_original / (1024 * 1024):.2f} MB")
+        print(f"衍生图大小: {total_derived / (1024 * 1024):.2f} MB")
 
 
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description='压缩图片以减小应用体积')
+    parser.add_argument('--images-dir', type=str, default='assets/images/pose_samples',
+                        help='图片目录 (默认assets/images/pose_samples)')
     parser.add_argument('--quality', type=int, default=75,
-                        help='JPEG质量 (1-95, 默认75)')
+                        help='编码质量上限 (1-95, 默认75)')
+    parser.add_argument('--codec', type=str, default='jpeg',
+                        help=f'候选编码器，逗号分隔，逐张保留最小结果 (可选: {", ".join(CODECS)}; 默认jpeg)')
+    parser.add_argument('--replace-format', action='store_true',
+                        help='允许选用与原图扩展名不同的编码器（写入新文件并删除原图）')
+    parser.add_argument('--target-ssim', type=float, default=None,
+                        help='自动调优：为每张图选择满足该SSIM阈值的最低质量 (如0.98)')
     parser.add_argument('--max-size', type=int, default=1200,
                         help='最大边长像素 (默认1200)')
     parser.add_argument('--workers', type=int, default=8,
                         help='并行处理进程数 (默认8)')
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help='每批提交给进程的图片数 (默认16)')
+    parser.add_argument('--draft', action='store_true',
+                        help='启用JPEG解码时降采样（大图更快）')
+    parser.add_argument('--derivatives', action='store_true',
+                        help='衍生图模式：生成缩略图和大图，不修改源图')
+    parser.add_argument('--derived-dir', type=str, default=None,
+                        help=f'衍生图输出目录 (默认: 图片目录上级/{DERIVED_DIRNAME})')
     parser.add_argument('--dry-run', action='store_true',
                         help='试运行模式，不实际压缩')
+    parser.add_argument('--state-file', type=str, default=None,
+                        help=f'增量状态文件 (默认: 图片目录上级/{STATE_FILENAME})')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略增量状态，重新压缩全部图片')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='将逐张/逐阶段耗时写入JSON-lines追踪文件，结束时打印汇总')
+    parser.add_argument('--profile', action='store_true',
+                        help='与 --trace 同用：为每个进程开启 cProfile 和 tracemalloc')
 
     args = parser.parse_args()
 
-    # 图片目录
-    images_dir = Path('/Users/jason/Documents/TRAE-app/post/post/pose_reference_app/assets/images/pose_samples')
+    if args.trace:
+        tracing.enable(args.trace, args.profile)
+
+    images_dir = Path(args.images_dir)
 
-    # 获取所有jpg图片
-    image_files = sorted(images_dir.glob('*.jpg'))
+    # 清理上次中断遗留的临时文件
+    if not args.dry_run:
+        removed = remove_stale_temp(images_dir)
+        if removed:
+            print(f"已清理上次中断遗留的临时文件: {removed} 个")
+
+    # 获取所有图片
+    image_files = list_images(images_dir)
 
     if not image_files:
         print("未找到图片文件")
         return
 
+    if args.derivatives:
+        out_root = Path(args.derived_dir) if args.derived_dir else images_dir.parent / DERIVED_DIRNAME
+        run_derivatives(args, image_files, out_root)
+        return
+
+    codecs = [c.strip() for c in args.codec.split(',') if c.strip()]
+    supported = available_codecs()
+    unsupported = [c for c in codecs if c not in supported]
+    if unsupported:
+        print(f"不支持的编码器: {', '.join(unsupported)} (可用: {', '.join(supported)})")
+        return
+
+    state_path = Path(args.state_file) if args.state_file else images_dir.parent / STATE_FILENAME
+
+    # 仅在显式更换格式时，删除上次中断遗留、日志中有更换记录的原图
+    if args.replace_format and not args.dry_run:
+        replaced = remove_replaced_originals(state_path)
+        if replaced:
+            print(f"已删除更换格式后遗留的原图: {len(replaced)} 张")
+            image_files = list_images(images_dir)
+
+    # --force 时丢弃上次运行的日志，避免旧条目在结束时被合并回状态
+    if args.force and not args.dry_run:
+        clear_journal(state_path)
+    state = {} if args.force else load_state(state_path)
+
+    # 跳过已满足目标的图片（不解码）
+    pending = []
+    new_state = {}
+    for img in image_files:
+        up_to_date, entry = is_up_to_date(img, state.get(img.name), args.quality, args.max_size, codecs)
+        if up_to_date:
+            new_state[img.name] = entry
+        else:
+            pending.append(img)
+    skipped_count = len(image_files) - len(pending)
+
+    # 更换格式会重命名资源，必须显式确认
+    renamed = [c for c in codecs if any(CODECS[c]['ext'] != img.suffix.lower() for img in pending)]
+    if renamed and not args.replace_format:
+        print(f"编码器 {', '.join(renamed)} 会改变部分图片的扩展名（写入新文件并删除原图）")
+        print("如确需更换格式，请加 --replace-format")
+        return
+
     print(f"找到 {len(image_files)} 张图片")
-    print(f"压缩参数: 质量={args.quality}, 最大尺寸={args.max_size}px")
+    print(f"压缩参数: 质量={args.quality}, 最大尺寸={args.max_size}px, 编码器={','.join(codecs)}")
+    if args.target_ssim:
+        print(f"自动调优: SSIM >= {args.target_ssim}, 质量范围 {MIN_QUALITY}-{args.quality}")
+    print(f"已是最新: {skipped_count} 张, 待压缩: {len(pending)} 张")
     print("-" * 50)
 
     if args.dry_run:
         print("试运行模式 - 不执行实际压缩")
         return
 
-    # 准备任务参数
-    task_args = [(str(img), args.quality, args.max_size) for img in image_files]
+    if not pending:
+        save_state(state_path, new_state)
+        print("所有图片均已满足目标，无需压缩")
+        return
+
+    # 任务参数按需生成，不预先构建完整列表
+    total_tasks = len(pending)
+    options = {
+        'quality': args.quality,
+        'max_size': args.max_size,
+        'draft': args.draft,
+        'codecs': codecs,
+        'target_ssim': args.target_ssim,
+        'replace_format': args.replace_format,
+        # 工作进程每完成一张即追加到日志，进程被强制结束后重新运行可从中断处继续
+        'journal': str(journal_path(state_path)),
+    }
+    task_args = ((str(img), options) for img in pending)
 
     # 并行处理
     total_original = 0
     total_compressed = 0
     success_count = 0
     failed_count = 0
+    failures = {}
+    codec_stats = {codec: {'count': 0, 'original': 0, 'compressed': 0, 'encode_time': 0.0}
+                   for codec in codecs}
 
-    with ProcessPoolExecutor(max_workers=args.workers) as executor:
-        futures = {executor.submit(compress_image, arg): arg for arg in task_args}
-
-        for i, future in enumerate(as_completed(futures)):
-            img_path, original_size, compressed_size, success = future.result()
-
-            if success:
-                total_original += original_size
-                total_compressed += compressed_size
-                success_count += 1
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            # 每个进程保留两个批次在途，既不空闲也不堆积结果
+            results = imap_unordered_bounded(executor, compress_batch, task_args,
+                                             max(1, args.chunksize), args.workers * 2)
+
+            for i, result in enumerate(results):
+                img_path, original_size, compressed_size, success, entry, encode_times = result
+
+                for codec, seconds in encode_times.items():
+                    codec_stats[codec]['encode_time'] += seconds
+
+                name = Path(img_path).name
+                if success:
+                    total_original += original_size
+                    total_compressed += compressed_size
+                    success_count += 1
+                    new_state[name] = entry
+
+                    stats = codec_stats[entry['codec']]
+                    stats['count'] += 1
+                    stats['original'] += original_size
+                    stats['compressed'] += compressed_size
+                else:
+                    failed_count += 1
+                    failures[name] = entry['error']
+                    print(f"失败: {img_path} ({entry['error']})")
 
                 # 每100张显示进度
-                if (i + 1) % 100 == 0 or (i + 1) == len(image_files):
-                    progress = (i + 1) / len(image_files) * 100
-                    print(f"进度: {progress:.1f}% ({i + 1}/{len(image_files)})")
-            else:
-                failed_count += 1
-                print(f"失败: {img_path}")
+                if (i + 1) % 100 == 0 or (i + 1) == total_tasks:
+                    progress = (i + 1) / total_tasks * 100
+                    print(f"进度: {progress:.1f}% ({i + 1}/{total_tasks})")
+    finally:
+        # 即使中断也保存已完成部分的状态：合并工作进程已写入日志、但结果尚未返回的图片
+        # （只合并仍存在的文件），以及日志中的失败原因（含上次被强制结束的运行），合并后清空日志
+        new_state.update((name, entry) for name, entry in read_journal(state_path).items()
+                         if name not in new_state and (images_dir / name).exists())
+        for name, error in read_journal_failures(state_path).items():
+            if name not in new_state and (images_dir / name).exists():
+                failures.setdefault(name, error)
+        if args.replace_format:
+            remove_replaced_originals(state_path)
+        with span('state_write'):
+            save_state(state_path, new_state, failures)
 
     # 显示结果
     print("-" * 50)
     print("压缩完成!")
     print(f"成功: {success_count} 张")
+    print(f"跳过: {skipped_count} 张")
     print(f"失败: {failed_count} 张")
+    if failures:
+        print(f"失败原因已记录到: {state_path}")
 
     if total_original > 0:
         saved_bytes = total_original - total_compressed
@@ -132,6 +682,13 @@ def main():
         print(f"压缩后大小: {compressed_mb:.2f} MB")
         print(f"节省空间: {saved_mb:.2f} MB ({saved_percent:.1f}%)")
 
+        # 各编码器统计
+        print("\n编码器统计:")
+        for codec, stats in codec_stats.items():
+            saved_mb = (stats['original'] - stats['compressed']) / (1024 * 1024)
+            print(f"  {codec}: 选用 {stats['count']} 张, 节省 {saved_mb:.2f} MB, "
+                  f"编码耗时 {stats['encode_time']:.1f} 秒")
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+按内容哈希缓存的逐图计算
+占位图、主色分析等阶段共用的流程：只把缓存中没有的 content_hash 交给进程池计算，
+结果写回缓存；缓存文件记录算法参数签名，参数变化后整体失效
+"""
+
+import json
+import hashlib
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_io import load_json, write_json
+from batching import imap_unordered_bounded
+
+
+def params_key(params):
+    """算法参数签名：参数（含算法版本）任一变化都会得到不同的签名"""
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def load_cache(cache_path, key):
+    """读取缓存 {内容哈希: 结果}；签名不一致时返回空缓存"""
+    data = load_json(cache_path, {})
+    if not isinstance(data, dict) or data.get('key') != key:
+        return {}
+    return data.get('entries', {})
+
+
+def save_cache(cache, cache_path, key):
+    write_json(cache_path, {'key': key, 'entries': cache}, sort_keys=True)
+
+
+def _compute_batch(func, batch):
+    """
+    批量计算
+
+    Returns:
+        列表 [(内容哈希, 图片路径, 结果, 错误信息)]，单张失败时结果为None、错误信息为异常文本
+    """
+    results = []
+    for content_hash, img_path in batch:
+        try:
+            results.append((content_hash, img_path, func(img_path), None))
+        except Exception as e:
+            results.append((content_hash, img_path, None, f'{type(e).__name__}: {e}'))
+    return results
+
+
+def compute_cached(files, func, cache_path, key, label, workers=8, chunksize=32):
+    """
+    为manifest记录计算逐图结果，缓存命中的图片不会被解码
+
+    失败的图片不写入缓存（下次运行会重试），逐张输出异常信息并汇总失败数。
+
+    Args:
+        files: manifest 的 files 列表（需含 content_hash 和 asset_path）
+        func: 模块级函数 func(图片路径) -> 可JSON序列化的结果
+        key: 算法参数签名（见 params_key）
+        label: 进度输出中的阶段名
+
+    Returns:
+        元组 (缓存 {内容哈希: 结果}, 新计算的图片数)
+    """
+    cache = load_cache(cache_path, key)
+
+    pending = {}
+    for item in files:
+        content_hash = item.get('content_hash')
+        if content_hash and content_hash not in cache:
+            pending.setdefault(content_hash, item['asset_path'])
+
+    if pending:
+        print(f"  {label}: {len(pending)} 张 (缓存命中 {len(files) - len(pending)} 张)")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = imap_unordered_bounded(executor, partial(_compute_batch, func), pending.items(),
+                                             chunksize, workers * 2)
+            failed = 0
+            for content_hash, img_path, result, error in results:
+                if error:
+                    failed += 1
+                    print(f"失败: {img_path} ({error})")
+                elif result:
+                    cache[content_hash] = result
+        if failed:
+            print(f"  {label}: 失败 {failed} 张")
+        save_cache(cache, cache_path, key)
+
+    return cache, len(pending)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+筛选面板的分面计数（asset_manifest.fct）
+对 N×12 编码矩阵做一次独热矩阵乘法，得到每个 (编码位, 代码) 的图片数，
+以及任意两个 (编码位, 代码) 同时出现的图片数；
+单条件和双条件筛选的"加上此条件后有多少张"只需查表
+
+文件布局（小端）:
+    头部    魔数 'POZF', 版本(u16), 图片数(u32), 词表大小V(u16), 计数字节数(u8)
+    词表    V 个 (编码位序号 u8, 代码 ASCII u8)，按 ENCODING_CODES 的定义顺序
+    计数    上三角（含对角线）按行存储的 V×(V+1)/2 个计数（u16 或 u32）；
+            对角线即单个代码的图片数
+
+用法:
+    python scripts/facet_counts.py [assets/images/asset_manifest.fct] [style=d] [pose=a]
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from atomic_io import write_atomic
+
+MAGIC = b'POZF'
+FORMAT_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sHIHBx')
+
+# 每次参与矩阵乘法的行数，限制独热矩阵的内存占用
+BLOCK_ROWS = 65536
+
+
+def build_vocabulary(definitions):
+    """词表：[(编码位, 代码)]，按定义顺序"""
+    return [(position, code) for position, codes in definitions.items() for code in codes]
+
+
+def compute_cooccurrence(codes, definitions, block_rows=BLOCK_ROWS):
+    """
+    计算共现矩阵
+
+    Args:
+        codes: N×12 uint8 编码矩阵（见 neighbor_table.build_code_matrix，未定义代码已归为 'z'）
+        definitions: 编码定义
+
+    Returns:
+        元组 (词表, V×V int64 对称共现矩阵)
+    """
+    vocabulary = build_vocabulary(definitions)
+    positions = list(definitions)
+    columns = np.array([positions.index(p) for p, _ in vocabulary])
+    values = np.array([ord(c) for _, c in vocabulary], dtype=np.uint8)
+
+    v = len(vocabulary)
+    counts = np.zeros((v, v), dtype=np.int64)
+    for start in range(0, len(codes), block_rows):
+        block = codes[start:start + block_rows]
+        # float32 矩阵乘法走 BLAS；每块行数远小于 2^24，计数精确
+        onehot = (block[:, columns] == values).astype(np.float32)
+        counts += np.rint(onehot.T @ onehot).astype(np.int64)
+    return vocabulary, counts
+
+
+def write_facets(path, vocabulary, counts, total):
+    """写入分面计数文件"""
+    v = len(vocabulary)
+    width = 2 if total < 0xFFFF else 4
+    dtype = np.dtype('<u2') if width == 2 else np.dtype('<u4')
+    positions = list(dict.fromkeys(p for p, _ in vocabulary))
+    vocab = bytes(b for p, c in vocabulary for b in (positions.index(p), ord(c)))
+    upper = counts[np.triu_indices(v)].astype(dtype)
+
+    write_atomic(path, HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, total, v, width) + vocab + upper.tobytes())
+
+
+def read_facets(path, positions):
+    """
+    读取分面计数
+
+    Args:
+        positions: 编码位名称列表（与写入时的定义顺序一致）
+
+    Returns:
+        元组 (图片数, 词表 {(编码位, 代码): 序号}, V×V 对称计数矩阵)
+    """
+    buf = Path(path).read_bytes()
+    magic, version, total, v, width = HEADER_STRUCT.unpack_from(buf, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f'不支持的分面计数文件: {path}')
+
+    offset = HEADER_STRUCT.size
+    raw = np.frombuffer(buf, dtype=np.uint8, count=2 * v, offset=offset).reshape(v, 2)
+    vocabulary = {(positions[p], chr(c)): i for i, (p, c) in enumerate(raw.tolist())}
+
+    dtype = np.dtype('<u2') if width == 2 else np.dtype('<u4')
+    upper = np.frombuffer(buf, dtype=dtype, count=v * (v + 1) // 2, offset=offset + 2 * v)
+    counts = np.zeros((v, v), dtype=np.int64)
+    counts[np.triu_indices(v)] = upper
+    counts = counts + np.triu(counts, 1).T
+    return total, vocabulary, counts
+
+
+def facet_count(vocabulary, counts, *selection):
+    """
+    单条件或双条件的匹配图片数
+
+    Args:
+        selection: 一个或两个 (编码位, 代码)
+    """
+    if len(selection) == 1:
+        i = vocabulary[selection[0]]
+        return int(counts[i, i])
+    a, b = selection
+    return int(counts[vocabulary[a], vocabulary[b]])
+
+
+if __name__ == '__main__':
+    from generate_encoded_manifest import POSITIONS
+
+    fct_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'assets/images/asset_manifest.fct')
+    images, vocab, matrix = read_facets(fct_path, POSITIONS)
+    print(f"{fct_path}: {images} 张图片, 词表 {len(vocab)} 项, {fct_path.stat().st_size} 字节")
+    criteria = [tuple(arg.split('=', 1)) for arg in sys.argv[2:4]]
+    if criteria:
+        print(f"  {' & '.join(f'{p}={c}' for p, c in criteria)}: {facet_count(vocab, matrix, *criteria)} 张")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+感知哈希近重复检测
+为manifest中的每张图片计算 dHash/pHash（进程池并行），用多索引哈希
+（按鸽巢原理把64位哈希切成 radius+1 段，候选对至少有一段完全相同）
+查找汉明距离不超过阈值的图片对（避免全量两两比较），再按序号贪心聚类
+
+输出:
+    聚类报告（每簇保留序号最小的一张，其余均在其阈值之内）与去重后的manifest
+
+用法:
+    python scripts/find_duplicates.py --radius 4 --hash dhash
+"""
+
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from atomic_io import write_json
+from batching import imap_unordered_bounded
+from image_io import load_resized
+
+HASH_BITS = 64
+
+
+def dhash(img):
+    """差值哈希：9×8 灰度图中相邻像素的大小关系"""
+    pixels = np.asarray(img.convert('L').resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    return np.packbits((pixels[:, 1:] > pixels[:, :-1]).ravel()).view('>u8')[0]
+
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    matrix[0] *= np.sqrt(1 / n)
+    matrix[1:] *= np.sqrt(2 / n)
+    return matrix
+
+
+DCT_32 = _dct_matrix(32)
+
+
+def phash(img):
+    """感知哈希：32×32 灰度图 DCT 的左上 8×8 低频系数与中位数比较"""
+    pixels = np.asarray(img.convert('L').resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (DCT_32 @ pixels @ DCT_32.T)[:8, :8].ravel()
+    return np.packbits(low > np.median(low[1:])).view('>u8')[0]
+
+
+HASH_FUNCS = {'dhash': dhash, 'phash': phash}
+
+
+def hash_batch(batch):
+    """批量计算感知哈希，返回 [(序号, 哈希或None)]"""
+    results = []
+    for index, img_path, method in batch:
+        try:
+            with Image.open(img_path) as img:
+                small = load_resized(img, 64, draft=True)
+                results.append((index, int(HASH_FUNCS[method](small))))
+        except Exception:
+            results.append((index, None))
+    return results
+
+
+def popcount(values):
+    """逐元素统计 uint64 中置位的个数"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    bits = np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+    return bits.reshape(values.shape)
+
+
+def chunk_masks(radius):
+    """把64位切成 radius+1 段，返回各段的 (位移, 掩码)"""
+    parts = min(radius + 1, HASH_BITS)
+    bounds = np.linspace(0, HASH_BITS, parts + 1).astype(int)
+    return [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def near_pairs(hashes, radius):
+    """
+    多索引哈希查找近重复对
+
+    Args:
+        hashes: (N,) uint64 哈希数组
+        radius: 汉明距离阈值
+
+    Returns:
+        集合 {(i, j, 距离)}，i < j
+    """
+    pairs = set()
+    for shift, mask in chunk_masks(radius):
+        keys = (hashes >> np.uint64(shift)) & np.uint64(mask)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end - start < 2:
+                continue
+            members = order[start:end]
+            group = hashes[members]
+            distances = popcount(group[:, None] ^ group[None, :])
+            rows, cols = np.nonzero(np.triu(distances <= radius, k=1))
+            for a, b in zip(rows.tolist(), cols.tolist()):
+                i, j = sorted((int(members[a]), int(members[b])))
+                pairs.add((i, j, int(distances[a, b])))
+    return pairs
+
+
+def cluster(pairs):
+    """
+    按序号贪心聚类（leader clustering）
+
+    从序号最小的图片开始，未归入任何簇的图片成为保留图，吸收与它距离
+    不超过阈值、且尚未归入其他簇的图片。每张重复图都在保留图的阈值之内，
+    不会像并查集那样沿近重复链把距离很远的图片连进同一簇。
+
+    Returns:
+        包含两张及以上图片的簇列表，每簇首个元素为保留图（按保留图序号排序）
+    """
+    neighbors = {}
+    for i, j, _ in pairs:
+        neighbors.setdefault(i, []).append(j)
+        neighbors.setdefault(j, []).append(i)
+
+    assigned = set()
+    clusters = []
+    for keeper in sorted(neighbors):
+        if keeper in assigned:
+            continue
+        # 序号更小的邻居要么已是保留图、要么已归入其他簇，只需看更大的
+        members = sorted(j for j in neighbors[keeper] if j > keeper and j not in assigned)
+        assigned.add(keeper)
+        assigned.update(members)
+        if members:
+            clusters.append([keeper, *members])
+    return clusters
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='感知哈希近重复检测')
+    parser.add_argument('--manifest', type=str, default='assets/images/asset_manifest.json',
+                        help='manifest路径')
+    parser.add_argument('--hash', type=str, default='dhash', choices=sorted(HASH_FUNCS),
+                        help='哈希算法 (默认dhash)')
+    parser.add_argument('--radius', type=int, default=4,
+                        help='汉明距离阈值 (默认4)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='并行处理进程数 (默认8)')
+    parser.add_argument('--report', type=str, default='assets/images/duplicate_report.json',
+                        help='聚类报告输出路径')
+    parser.add_argument('--output', type=str, default='assets/images/asset_manifest.dedup.json',
+                        help='去重后的manifest输出路径')
+
+    args = parser.parse_args()
+
+    with open(args.manifest, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = manifest['files']
+    print(f"正在为 {len(files)} 张照片计算 {args.hash}...")
+
+    hashes = np.zeros(len(files), dtype=np.uint64)
+    hashed = np.zeros(len(files), dtype=bool)
+    tasks = ((i, item['asset_path'], args.hash) for i, item in enumerate(files))
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for index, value in imap_unordered_bounded(executor, hash_batch, tasks, 32, args.workers * 2):
+            if value is not None:
+                hashes[index] = value
+                hashed[index] = True
+
+    valid = np.flatnonzero(hashed)
+    if len(valid) < len(files):
+        print(f"  无法读取: {len(files) - len(valid)} 张（不参与去重）")
+
+    pairs = {(int(valid[i]), int(valid[j]), d) for i, j, d in near_pairs(hashes[valid], args.radius)}
+    clusters = cluster(pairs)
+
+    report = {
+        'hash': args.hash,
+        'radius': args.radius,
+        'total_images': len(files),
+        'clusters': [{
+            'keep': files[members[0]]['asset_path'],
+            'duplicates': [{
+                'asset_path': files[i]['asset_path'],
+                'distance': int(popcount(hashes[members[0]] ^ hashes[i:i + 1])[0]),
+            } for i in members[1:]],
+        } for members in clusters],
+    }
+    removed = {i for members in clusters for i in members[1:]}
+
+    write_json(args.report, report, indent=2)
+
+    pruned = dict(manifest, files=[item for i, item in enumerate(files) if i not in removed])
+    pruned['total_images'] = len(pruned['files'])
+    write_json(args.output, pruned, indent=2)
+
+    print(f"近重复对: {len(pairs)} 个, 聚类: {len(clusters)} 簇, 可移除: {len(removed)} 张")
+    print(f"报告: {args.report}")
+    print(f"去重后manifest: {args.output} ({pruned['total_images']} 张)")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,23 @@
 生成支持12位编码的asset_manifest.json
 """
 
-import json
+import os
 from pathlib import Path
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from atomic_io import dumps_json, write_atomic, write_json
+from image_io import DERIVATIVE_SPECS, DERIVED_DIRNAME, IMAGE_EXTENSIONS, file_digest
+from manifest_binary import write_binary_manifest, verify_round_trip
+from bitmap_index import build_index, write_index
+from neighbor_table import build_code_matrix, compute_neighbors, write_neighbors
+from manifest_shards import write_shards
+from manifest_delta import compute_delta
+from facet_counts import compute_cooccurrence, write_facets
+from tracing import span
 
 # 12位编码定义
 ENCODING_CODES = {
@@ -61,72 +76,293 @@ ENCODING_CODES = {
 }
 
 
+# 编码位顺序（与文件名中的12位编码一一对应）
+POSITIONS = list(ENCODING_CODES)
+
+# 各编码位的合法代码查找表: KNOWN_CODES[位, 字节] 为 True 表示已定义
+KNOWN_CODES = np.zeros((len(POSITIONS), 256), dtype=bool)
+for _col, _position in enumerate(POSITIONS):
+    KNOWN_CODES[_col, [ord(c) for c in ENCODING_CODES[_position]]] = True
+
+# 批量解析结果
+#   sequence:  (N,) int64 序号，空或非数字序号为 -1
+#   codes:     (N, 12) uint8 编码字节，格式错误的行为 0
+#   valid:     (N,) bool 文件名格式是否正确（编码须为12位ASCII）
+#   unknown:   (N, 12) bool 该位代码是否未定义（仅对 valid 行有意义）
+#   seq_text:  (N,) 序号原文
+#   code_text: (N,) 12位编码原文
+ParsedFilenames = namedtuple('ParsedFilenames',
+                             ['sequence', 'codes', 'valid', 'unknown', 'seq_text', 'code_text'])
+
+
+def parse_encoded_filenames(filenames):
+    """
+    批量解析编码文件名
+    格式: 0001-eaabbgcbbegd.jpg
+
+    Args:
+        filenames: 文件名可迭代对象
+
+    Returns:
+        ParsedFilenames
+    """
+    stems = np.array([Path(name).stem for name in filenames], dtype=str)
+    if stems.size == 0:
+        stems = stems.astype('U1')
+    parts = np.char.partition(stems, '-')
+    seq_text, sep, code_text = parts[:, 0], parts[:, 1], parts[:, 2]
+
+    # 恰好一个'-'且编码为12位
+    valid = (sep == '-') & (np.char.str_len(code_text) == 12) & (np.char.count(code_text, '-') == 0)
+
+    n = len(stems)
+    fixed = np.where(valid, code_text, '').astype('U12')
+    points = fixed.view(np.uint32).reshape(n, 12)
+    # 非ASCII编码无法写入二进制manifest和位图索引，视为格式错误
+    valid &= (points < 128).all(axis=1)
+    codes = np.where(valid[:, None], points, 0).astype(np.uint8)
+    unknown = ~KNOWN_CODES[np.arange(12), codes]
+
+    numeric = valid & np.char.isdigit(seq_text)
+    sequence = np.full(n, -1, dtype=np.int64)
+    if numeric.any():
+        sequence[numeric] = seq_text[numeric].astype(np.int64)
+
+    return ParsedFilenames(sequence, codes, valid, unknown, seq_text, code_text)
+
+
+def encoding_view(parsed, index):
+    """
+    由批量解析结果构建单条记录的12位编码字典
+
+    Returns:
+        (序号, 12位编码字典)，格式错误时为 (None, None)
+    """
+    if not parsed.valid[index]:
+        return None, None
+    code = str(parsed.code_text[index])
+    encoding = {
+        position: {'code': c, 'name': ENCODING_CODES[position].get(c, '未知')}
+        for position, c in zip(POSITIONS, code)
+    }
+    return str(parsed.seq_text[index]), encoding
+
+
 def parse_encoded_filename(filename):
     """
     解析编码后的文件名
     格式: 0001-eaabbgcbbegd.jpg
     返回: (序号, 12位编码字典)
     """
-    stem = Path(filename).stem
-    parts = stem.split('-')
-    
-    if len(parts) != 2 or len(parts[1]) != 12:
-        return None, None
-    
-    seq = parts[0]
-    code = parts[1]
-    
-    # 解析12位编码
-    encoding = {
-        'shot_size': {'code': code[0], 'name': ENCODING_CODES['shot_size'].get(code[0], '未知')},
-        'composition': {'code': code[1], 'name': ENCODING_CODES['composition'].get(code[1], '未知')},
-        'angle': {'code': code[2], 'name': ENCODING_CODES['angle'].get(code[2], '未知')},
-        'pose': {'code': code[3], 'name': ENCODING_CODES['pose'].get(code[3], '未知')},
-        'action': {'code': code[4], 'name': ENCODING_CODES['action'].get(code[4], '未知')},
-        'emotion': {'code': code[5], 'name': ENCODING_CODES['emotion'].get(code[5], '未知')},
-        'clothing': {'code': code[6], 'name': ENCODING_CODES['clothing'].get(code[6], '未知')},
-        'hair': {'code': code[7], 'name': ENCODING_CODES['hair'].get(code[7], '未知')},
-        'color': {'code': code[8], 'name': ENCODING_CODES['color'].get(code[8], '未知')},
-        'season': {'code': code[9], 'name': ENCODING_CODES['season'].get(code[9], '未知')},
-        'scene': {'code': code[10], 'name': ENCODING_CODES['scene'].get(code[10], '未知')},
-        'style': {'code': code[11], 'name': ENCODING_CODES['style'].get(code[11], '未知')},
+    return encoding_view(parse_encoded_filenames([filename]), 0)
+
+
+def find_derivatives(filename, derived_dir):
+    """
+    查找图片的衍生图（缩略图/大图）
+
+    Returns:
+        字典 {规格: 资源路径}，衍生图不完整时返回None
+    """
+    filename = Path(filename).stem + '.jpg'
+    paths = {}
+    for kind in DERIVATIVE_SPECS:
+        if not (derived_dir / kind / filename).exists():
+            return None
+        paths[kind] = f'assets/images/{DERIVED_DIRNAME}/{kind}/{filename}'
+    return paths
+
+
+def read_image_info(img_path):
+    """
+    读取图片尺寸、文件大小和内容哈希
+
+    Image.open 只解析文件头，不解码像素；哈希只读取字节。
+
+    Returns:
+        字典 {width, height, aspect_ratio, file_size, content_hash}
+    """
+    file_size = os.path.getsize(img_path)
+    with span('read_info', img_path, file_size):
+        with Image.open(img_path) as img:
+            width, height = img.size
+        content_hash = file_digest(img_path)
+    return {
+        'width': width,
+        'height': height,
+        'aspect_ratio': round(width / height, 4) if height else 0,
+        'file_size': file_size,
+        'content_hash': content_hash,
     }
-    
-    return seq, encoding
 
 
-def generate_manifest():
-    """生成asset_manifest.json"""
-    base_dir = Path('assets/images/pose_samples')
+def unique_stems(paths):
+    """
+    同一文件名（不含扩展名）存在多个格式时只保留修改时间最新的一个
+
+    更换编码格式时中断会同时留下新旧两个文件（见 compress_images.remove_replaced_originals），
+    两者序号相同，不能同时进入manifest。
+
+    Returns:
+        排序后的文件名列表
+    """
+    by_stem = {}
+    for path in paths:
+        by_stem.setdefault(path.stem, []).append(path)
+
+    names = []
+    for stem, candidates in by_stem.items():
+        if len(candidates) > 1:
+            candidates.sort(key=lambda p: p.stat().st_mtime_ns)
+            print(f"⚠️  {stem} 存在多个格式，使用 {candidates[-1].name}")
+        names.append(candidates[-1].name)
+    return sorted(names)
+
+
+def build_records(base_dir=Path('assets/images/pose_samples'), workers=8):
+    """
+    扫描图片目录，按文件名解析生成manifest记录
+
+    图片头信息在线程池中并行读取：以文件I/O为主，hashlib 处理大块数据时释放GIL。
+
+    Returns:
+        files 列表
+    """
+    derived_dir = base_dir.parent / DERIVED_DIRNAME
     
-    files = []
-    for img_path in sorted(base_dir.glob('*.jpg')):
-        seq, encoding = parse_encoded_filename(img_path.name)
-        if seq and encoding:
-            files.append({
-                'asset_path': f'assets/images/pose_samples/{img_path.name}',
-                'filename': img_path.name,
+    with span('scan'):
+        names = unique_stems(p for p in base_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        parsed = parse_encoded_filenames(names)
+
+    indices = [i for i in np.flatnonzero(parsed.valid).tolist() if parsed.seq_text[i]]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        infos = executor.map(read_image_info, (base_dir / names[i] for i in indices))
+
+        files = []
+        for i, info in zip(indices, infos):
+            name = names[i]
+            seq, encoding = encoding_view(parsed, i)
+            record = {
+                'asset_path': f'assets/images/pose_samples/{name}',
+                'filename': name,
                 'sequence': seq,
                 'encoding': encoding,
-                'full_code': ''.join([encoding[k]['code'] for k in ['shot_size', 'composition', 'angle', 'pose', 'action', 'emotion', 'clothing', 'hair', 'color', 'season', 'scene', 'style']])
-            })
-    
-    manifest = {
+                'full_code': str(parsed.code_text[i]),
+                **info,
+            }
+            derivatives = find_derivatives(name, derived_dir)
+            if derivatives:
+                record['derivatives'] = derivatives
+            files.append(record)
+    return files
+
+
+def build_manifest(files):
+    """组装manifest字典"""
+    return {
         'version': '2.0',
         'encoding_version': 'v3',
         'total_images': len(files),
         'encoding_definitions': ENCODING_CODES,
         'files': files
     }
+
+
+def write_manifest(manifest, output_path=Path('assets/images/asset_manifest.json')):
+    """
+    原子写入JSON manifest，并同步生成二进制manifest、位图索引、邻居表、分面计数和分片manifest
+
+    JSON 最后替换：任一附属文件生成失败时现有 JSON 保持不变，重新运行即可。
+    输出路径已有manifest时，另写出相对它的增量（.delta.json）。
+
+    Returns:
+        元组 (二进制manifest路径, 位图索引路径, 邻居表路径, 分面计数路径, 分片根索引路径)
+    """
+    # 先完整写入并落盘到 .tmp，附属文件全部生成后再替换
+    tmp_path = Path(f'{output_path}.tmp')
+    with span('json_write', output_path) as record:
+        data = dumps_json(manifest, indent=2)
+        write_atomic(tmp_path, data)
+        record['bytes_out'] = len(data)
+
+    try:
+        outputs = write_companions(manifest, output_path)
+
+        # 相对上一版本的增量，客户端可据此增量更新
+        if output_path.exists():
+            delta_path = output_path.with_suffix('.delta.json')
+            try:
+                with span('delta'):
+                    write_json(delta_path, compute_delta(output_path, tmp_path))
+            except (ValueError, KeyError) as e:
+                print(f"跳过增量生成（上一版本无法解析: {e}）")
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(output_path)
+    return outputs
+
+
+def write_companions(manifest, output_path):
+    """
+    生成与JSON manifest并列的附属文件
+
+    Returns:
+        元组 (二进制manifest路径, 位图索引路径, 邻居表路径, 分面计数路径, 分片根索引路径)
+    """
+    files = manifest['files']
+
+    # 可内存映射的二进制manifest，并校验往返一致
+    binary_path = output_path.with_suffix('.bin')
+    with span('binary'):
+        write_binary_manifest(binary_path, files, ENCODING_CODES)
+        mismatches = verify_round_trip(binary_path, files, ENCODING_CODES)
+    if mismatches:
+        raise RuntimeError(f"二进制manifest校验失败: {mismatches} 条记录不一致")
+
+    # 倒排位图索引：序号与 files 下标一致
+    index_path = output_path.with_suffix('.idx')
+    with span('bitmap_index'):
+        write_index(index_path, build_index(files, list(ENCODING_CODES)), len(files))
+
+    # 相似姿势 Top-K 邻居表
+    neighbor_path = output_path.with_suffix('.nbr')
+    code_matrix = build_code_matrix(files, ENCODING_CODES)
+    with span('neighbors'):
+        neighbors, scores = compute_neighbors(code_matrix, list(ENCODING_CODES))
+        write_neighbors(neighbor_path, neighbors, scores)
+
+    # 分面计数：单条件/双条件筛选的匹配数
+    facet_path = output_path.with_suffix('.fct')
+    with span('facets'):
+        write_facets(facet_path, *compute_cooccurrence(code_matrix, ENCODING_CODES), len(files))
+
+    # 按风格分片，首屏只需读取根索引
+    with span('shards'):
+        shard_index_path, _ = write_shards(manifest, output_path.parent / 'manifest_shards')
+
+    return binary_path, index_path, neighbor_path, facet_path, shard_index_path
+
+
+def generate_manifest():
+    """生成asset_manifest.json"""
+    files = build_records()
+    manifest = build_manifest(files)
     
     # 保存manifest
     output_path = Path('assets/images/asset_manifest.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    binary_path, index_path, neighbor_path, facet_path, shard_index_path = write_manifest(manifest, output_path)
     
     print(f"生成完成!")
     print(f"共 {len(files)} 张照片")
+    print(f"含衍生图: {sum(1 for f in files if 'derivatives' in f)} 张")
     print(f"保存到: {output_path}")
+    print(f"二进制manifest: {binary_path} ({binary_path.stat().st_size} 字节, "
+          f"JSON {output_path.stat().st_size} 字节)")
+    print(f"位图索引: {index_path} ({index_path.stat().st_size} 字节)")
+    print(f"邻居表: {neighbor_path} ({neighbor_path.stat().st_size} 字节)")
+    print(f"分面计数: {facet_path} ({facet_path.stat().st_size} 字节)")
+    print(f"分片根索引: {shard_index_path} ({shard_index_path.stat().st_size} 字节)")
     
     # 显示前3个示例
     print("\n前3个示例:")
@@ -8,6 +8,9 @@ import json
 import random
 from pathlib import Path
 
+from seeding import stable_seed
+from tracing import traced
+
 # 姿势类型定义
 POSE_TYPES = {
     'standing': ['正面站', '侧面站', '背面站', '倚靠站', '单腿站', '交叉站', 'S型站'],
@@ -39,8 +42,8 @@ def infer_pose_tags(category: str, filename: str, index: int) -> dict:
     根据分类和文件名推断姿势标签
     使用确定性随机，确保同一照片每次生成的标签一致
     """
-    # 使用文件名作为种子，确保一致性
-    seed = hash(f"{category}_{filename}") % 10000
+    # 使用文件名的稳定哈希作为种子，确保跨进程一致
+    seed = stable_seed(f"{category}_{filename}")
     rng = random.Random(seed)
     
     # 根据分类推断主要姿势类型
@@ -80,20 +83,15 @@ def infer_pose_tags(category: str, filename: str, index: int) -> dict:
     
     return tags
 
-def update_manifest_with_tags():
-    """更新 asset_manifest.json，为每张照片添加姿势标签"""
-    manifest_path = Path('assets/images/asset_manifest.json')
-    
-    with open(manifest_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+@traced('pose_tags')
+def apply_pose_tags(data):
+    """为内存中的manifest添加姿势标签"""
     files = data.get('files', [])
-    print(f"正在为 {len(files)} 张照片生成姿势标签...")
-    
+
     # 为每张照片添加标签
     for i, item in enumerate(files):
         asset_path = item['asset_path']
-        category = item['category']
+        category = item.get('category', '')
         filename = Path(asset_path).name
         
         # 生成标签
@@ -104,6 +102,18 @@ def update_manifest_with_tags():
         
         if (i + 1) % 500 == 0:
             print(f"  已处理 {i + 1}/{len(files)} 张照片")
+
+def update_manifest_with_tags():
+    """更新 asset_manifest.json，为每张照片添加姿势标签"""
+    manifest_path = Path('assets/images/asset_manifest.json')
+    
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    files = data.get('files', [])
+    print(f"正在为 {len(files)} 张照片生成姿势标签...")
+    
+    apply_pose_tags(data)
     
     # 保存更新后的 manifest
     with open(manifest_path, 'w', encoding='utf-8') as f:
@@ -115,7 +125,7 @@ def update_manifest_with_tags():
     print("\n示例数据：")
     for item in files[:3]:
         print(f"\n文件: {item['asset_path']}")
-        print(f"  分类: {item['category']}")
+        print(f"  分类: {item.get('category', '')}")
         print(f"  姿势标签: {json.dumps(item['pose_tags'], ensure_ascii=False)}")
 
 if __name__ == '__main__':
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+图片读写工具
+压缩、衍生图、占位图、主色与图集等脚本共用的编码器定义、解码缩放和内容哈希
+"""
+
+import hashlib
+from io import BytesIO
+from PIL import Image
+
+from tracing import span
+
+# 输出编码器：{名称: 保存格式、扩展名与固定编码参数}
+CODECS = {
+    'jpeg': {'format': 'JPEG', 'ext': '.jpg', 'options': {'optimize': True}},
+    'webp': {'format': 'WEBP', 'ext': '.webp', 'options': {'method': 6}},
+    'avif': {'format': 'AVIF', 'ext': '.avif', 'options': {'speed': 6}},
+}
+
+# 可被处理的图片扩展名
+IMAGE_EXTENSIONS = tuple(codec['ext'] for codec in CODECS.values())
+
+# 衍生图规格：{目录名: (最大宽, 最大高)}
+DERIVATIVE_SPECS = {
+    'thumb': (200, 260),
+    'full': (1200, 1600),
+}
+
+# 衍生图默认输出目录名（位于图片目录的上级，与 pose_samples 平行）
+DERIVED_DIRNAME = 'derived'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """计算文件内容哈希（blake2b-128）"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def target_size(size, max_size):
+    """
+    计算等比缩放到限制范围内的尺寸
+
+    Args:
+        size: 原始尺寸 (宽, 高)
+        max_size: 最大边长像素，或 (最大宽, 最大高) 元组
+
+    Returns:
+        新尺寸元组，无需缩放时返回None
+    """
+    if not max_size:
+        return None
+    max_width, max_height = max_size if isinstance(max_size, tuple) else (max_size, max_size)
+
+    width, height = size
+    if width > max_width or height > max_height:
+        ratio = min(max_width / width, max_height / height)
+        return (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    return None
+
+
+def load_resized(img, max_size, draft=False):
+    """
+    解码并缩放图片
+
+    draft=True 时先用 libjpeg 的 DCT 域缩放直接解码到不小于目标尺寸的
+    最近 1/2^n 尺寸，再用 LANCZOS 完成高质量缩放，可省去大部分解码工作。
+
+    Args:
+        img: 已打开（尚未解码）的 PIL 图片
+        max_size: 最大边长像素，或 (最大宽, 最大高) 元组
+        draft: 是否启用解码时降采样
+
+    Returns:
+        RGB 模式的图片
+    """
+    new_size = target_size(img.size, max_size)
+
+    with span('decode'):
+        if draft and new_size and img.format == 'JPEG':
+            # draft 会选择不小于请求尺寸的最大缩放比例
+            img.draft('RGB', new_size)
+        img.load()
+
+    with span('resize'):
+        # 转换为RGB模式（处理RGBA或其他模式）
+        if img.mode in ('RGBA', 'P'):
+            img = img.convert('RGB')
+
+        if new_size and img.size != new_size:
+            # 按比例缩放
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+    return img
+
+
+def encode_image(img, codec, quality):
+    """按指定编码器和质量编码到内存"""
+    spec = CODECS[codec]
+    buf = BytesIO()
+    with span(f'encode_{codec}') as record:
+        img.save(buf, spec['format'], quality=quality, **spec['options'])
+        record['bytes_out'] = buf.tell()
+    return buf.getvalue()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+紧凑二进制manifest（asset_manifest.bin）的读写
+定长记录表 + 单个字典块，可直接内存映射后筛选，无需解析JSON
+
+文件布局（小端）:
+    头部   HEADER_STRUCT  魔数、版本、记录数、各区块偏移
+    字典块              扩展名表 + 12个编码位的 {代码: 名称}
+    记录表 RECORD_STRUCT  每张图片一条: 序号(u32) + 12位编码(ASCII) + 扩展名索引(u8) + 序号位数(u8)
+    序号块              无法按数值定长还原的序号原文（单字节长度前缀的UTF-8）
+
+序号按记录保存位数，0001 与 12345 可以共存；位数为0时序号字段是序号块内的偏移
+
+用法:
+    python scripts/manifest_binary.py [assets/images/asset_manifest.bin]
+"""
+
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+from atomic_io import write_atomic
+
+MAGIC = b'POZM'
+FORMAT_VERSION = 2
+
+# 魔数, 版本, 记录长度, 记录数, 字典块偏移, 字典块长度, 记录表偏移, 序号块偏移, 序号块长度
+HEADER_STRUCT = struct.Struct('<4sHHIIIIII')
+
+# 序号或序号块偏移, 12位编码, 扩展名索引, 序号位数（补齐到4字节对齐）
+RECORD_STRUCT = struct.Struct('<I12sBB2x')
+
+# 序号位数为该值时，序号保存在序号块中
+SEQ_IN_POOL = 0
+
+CODE_LENGTH = 12
+
+
+def _pack_str(text):
+    """单字节长度前缀的UTF-8字符串"""
+    data = text.encode('utf-8')
+    if len(data) > 255:
+        raise ValueError(f'字符串过长: {text!r}')
+    return bytes([len(data)]) + data
+
+
+def _unpack_str(buf, offset):
+    length = buf[offset]
+    start = offset + 1
+    return bytes(buf[start:start + length]).decode('utf-8'), start + length
+
+
+def encode_dictionary(definitions, extensions):
+    """
+    编码字典块
+
+    Args:
+        definitions: 有序的 {编码位: {代码: 名称}}，顺序即编码位顺序
+        extensions: 扩展名列表，记录中保存其索引
+    """
+    if len(definitions) != CODE_LENGTH:
+        raise ValueError(f'编码位数量应为 {CODE_LENGTH}，实际为 {len(definitions)}')
+
+    out = bytearray([len(extensions)])
+    for ext in extensions:
+        out += _pack_str(ext)
+    for position, codes in definitions.items():
+        out += _pack_str(position)
+        out.append(len(codes))
+        for code, name in codes.items():
+            out += code.encode('ascii')
+            out += _pack_str(name)
+    return bytes(out)
+
+
+def decode_dictionary(buf):
+    """
+    解码字典块
+
+    Returns:
+        元组 (编码定义, 扩展名列表)
+    """
+    offset = 1
+    extensions = []
+    for _ in range(buf[0]):
+        ext, offset = _unpack_str(buf, offset)
+        extensions.append(ext)
+
+    definitions = {}
+    for _ in range(CODE_LENGTH):
+        position, offset = _unpack_str(buf, offset)
+        count = buf[offset]
+        offset += 1
+        codes = {}
+        for _ in range(count):
+            code = chr(buf[offset])
+            name, offset = _unpack_str(buf, offset + 1)
+            codes[code] = name
+        definitions[position] = codes
+    return definitions, extensions
+
+
+def numeric_sequence(sequence):
+    """
+    序号能否按 (数值, 位数) 定长保存
+
+    Returns:
+        元组 (数值, 位数)，否则返回None
+    """
+    if sequence.isascii() and sequence.isdigit() and len(sequence) < 256 and int(sequence) < 1 << 32:
+        return int(sequence), len(sequence)
+    return None
+
+
+def write_binary_manifest(path, files, definitions):
+    """
+    写入二进制manifest
+
+    Args:
+        path: 输出路径
+        files: manifest中的 files 列表（需含 filename/sequence/full_code，
+               编码为12位ASCII，见 generate_encoded_manifest.parse_encoded_filenames）
+        definitions: ENCODING_CODES
+    """
+    extensions = sorted({Path(f['filename']).suffix for f in files})
+    ext_index = {ext: i for i, ext in enumerate(extensions)}
+
+    records = bytearray()
+    pool = bytearray()
+    for f in files:
+        code = f['full_code'].encode('ascii')
+        if len(code) != CODE_LENGTH:
+            raise ValueError(f"编码长度应为 {CODE_LENGTH}: {f['filename']}")
+        numeric = numeric_sequence(f['sequence'])
+        if numeric:
+            value, width = numeric
+        else:
+            value, width = len(pool), SEQ_IN_POOL
+            pool += _pack_str(f['sequence'])
+        records += RECORD_STRUCT.pack(value, code, ext_index[Path(f['filename']).suffix], width)
+
+    dictionary = encode_dictionary(definitions, extensions)
+    dict_offset = HEADER_STRUCT.size
+    # 记录表按4字节对齐，便于客户端直接按定长读取
+    records_offset = (dict_offset + len(dictionary) + 3) & ~3
+    pool_offset = records_offset + len(records)
+    header = HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, RECORD_STRUCT.size, len(files),
+                                dict_offset, len(dictionary), records_offset, pool_offset, len(pool))
+
+    padding = b'\0' * (records_offset - dict_offset - len(dictionary))
+    write_atomic(path, header + dictionary + padding + bytes(records) + bytes(pool))
+
+
+class BinaryManifest:
+    """
+    内存映射方式读取二进制manifest
+
+    记录按需解码；筛选直接比较映射内存中的编码字节。
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, record_size, self.count, dict_offset, dict_length,
+         self._records_offset, self._pool_offset, _) = HEADER_STRUCT.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD_STRUCT.size:
+            self.close()
+            raise ValueError(f'不支持的二进制manifest: {path}')
+
+        self.definitions, self.extensions = decode_dictionary(
+            memoryview(self._buf)[dict_offset:dict_offset + dict_length])
+        self.positions = list(self.definitions)
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """
+        读取第 index 条记录
+
+        Returns:
+            元组 (序号字符串, 12位编码, 文件名)
+        """
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        seq, code, ext, width = RECORD_STRUCT.unpack_from(
+            self._buf, self._records_offset + index * RECORD_STRUCT.size)
+        if width == SEQ_IN_POOL:
+            sequence, _ = _unpack_str(self._buf, self._pool_offset + seq)
+        else:
+            sequence = str(seq).zfill(width)
+        full_code = code.decode('ascii')
+        return sequence, full_code, f'{sequence}-{full_code}{self.extensions[ext]}'
+
+    def code_at(self, index, position):
+        """读取单条记录某一编码位的代码字节"""
+        offset = self._records_offset + index * RECORD_STRUCT.size + 4 + self.positions.index(position)
+        return chr(self._buf[offset])
+
+    def filter(self, **criteria):
+        """
+        按编码位筛选，如 filter(pose='a', style='d')
+
+        Returns:
+            匹配记录的下标列表
+        """
+        checks = [(4 + self.positions.index(position), ord(code))
+                  for position, code in criteria.items()]
+        size = RECORD_STRUCT.size
+        buf = self._buf
+        base = self._records_offset
+        return [i for i in range(self.count)
+                if all(buf[base + i * size + offset] == code for offset, code in checks)]
+
+    def to_file_record(self, index):
+        """还原为与JSON manifest一致的记录（不含衍生图等附加字段）"""
+        sequence, full_code, filename = self.record(index)
+        encoding = {
+            position: {'code': code, 'name': self.definitions[position].get(code, '未知')}
+            for position, code in zip(self.positions, full_code)
+        }
+        return {
+            'asset_path': f'assets/images/pose_samples/{filename}',
+            'filename': filename,
+            'sequence': sequence,
+            'encoding': encoding,
+            'full_code': full_code,
+        }
+
+
+def verify_round_trip(path, files, definitions):
+    """
+    校验二进制manifest与JSON记录一致
+
+    Returns:
+        不一致的记录数
+    """
+    keys = ('asset_path', 'filename', 'sequence', 'encoding', 'full_code')
+    with BinaryManifest(path) as manifest:
+        if manifest.definitions != definitions or len(manifest) != len(files):
+            return max(len(files), 1)
+        return sum(1 for i, f in enumerate(files)
+                   if manifest.to_file_record(i) != {k: f[k] for k in keys})
+
+
+if __name__ == '__main__':
+    bin_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'assets/images/asset_manifest.bin')
+    with BinaryManifest(bin_path) as manifest:
+        print(f"{bin_path}: {len(manifest)} 条记录, {bin_path.stat().st_size} 字节")
+        for i in range(min(3, len(manifest))):
+            print(f"  {manifest.record(i)}")
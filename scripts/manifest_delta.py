@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+manifest 增量（delta）
+以序号（sequence）为键记录新增、删除和变化的记录，并附带基准版本与目标版本的
+内容哈希；应用前校验基准哈希，应用后校验目标哈希，增量更新只需传输变化的记录
+
+计算时两个manifest都以流式方式读取：基准只保留 {序号: 记录摘要}，
+目标逐条比较，内存不随记录大小增长
+
+增量格式（JSON）:
+    format_version  格式版本
+    base_hash       基准manifest的内容哈希
+    target_hash     目标manifest的内容哈希
+    header          变化的顶层字段（files 以外）
+    header_removed  删除的顶层字段
+    added / changed 新增/变化的完整记录
+    removed         删除的序号
+
+用法:
+    python scripts/manifest_delta.py diff old.json new.json -o asset_manifest.delta.json
+    python scripts/manifest_delta.py apply old.json asset_manifest.delta.json -o new.json
+"""
+
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+from atomic_io import write_json
+
+FORMAT_VERSION = 1
+
+CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """按块读取文本并提供 raw_decode，保证数值等值不会在块边界处被截断"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """跳过空白并返回下一个字符（到达末尾时返回空串）"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'manifest格式错误: 期望 {char!r}')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def stream_manifest(path, header):
+    """
+    流式读取manifest，逐条产出 files 中的记录
+
+    其余顶层字段在读取过程中写入 header 字典。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'files':
+                reader.expect('[')
+                if reader.peek() != ']':
+                    while True:
+                        yield reader.value()
+                        if reader.peek() != ',':
+                            break
+                        reader.expect(',')
+                reader.expect(']')
+            else:
+                header[key] = reader.value()
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+        reader.expect('}')
+
+
+def canonical(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def record_digest(record):
+    return hashlib.blake2b(canonical(record), digest_size=16).digest()
+
+
+def manifest_hash(header, records_hasher):
+    """由顶层字段和按顺序累积的记录摘要计算manifest内容哈希"""
+    combined = hashlib.blake2b(digest_size=16)
+    combined.update(canonical(header))
+    combined.update(records_hasher.digest())
+    return combined.hexdigest()
+
+
+def hash_manifest(path):
+    """流式计算manifest内容哈希"""
+    header = {}
+    records = hashlib.blake2b(digest_size=16)
+    for record in stream_manifest(path, header):
+        records.update(record_digest(record))
+    return manifest_hash(header, records)
+
+
+def compute_delta(base_path, target_path):
+    """
+    计算从基准到目标的增量
+
+    序号重复时无法按序号定位记录，抛出 ValueError。
+
+    Returns:
+        增量字典（见模块说明）
+    """
+    base_header = {}
+    base_records = hashlib.blake2b(digest_size=16)
+    base_digests = {}
+    for record in stream_manifest(base_path, base_header):
+        digest = record_digest(record)
+        base_records.update(digest)
+        if record['sequence'] in base_digests:
+            raise ValueError(f"基准版本中序号重复: {record['sequence']}")
+        base_digests[record['sequence']] = digest
+
+    target_header = {}
+    target_records = hashlib.blake2b(digest_size=16)
+    added, changed = [], []
+    seen = set()
+    for record in stream_manifest(target_path, target_header):
+        digest = record_digest(record)
+        target_records.update(digest)
+        sequence = record['sequence']
+        if sequence in seen:
+            raise ValueError(f"目标版本中序号重复: {sequence}")
+        seen.add(sequence)
+        if sequence not in base_digests:
+            added.append(record)
+        elif base_digests[sequence] != digest:
+            changed.append(record)
+
+    return {
+        'format_version': FORMAT_VERSION,
+        'base_hash': manifest_hash(base_header, base_records),
+        'target_hash': manifest_hash(target_header, target_records),
+        'header': {key: value for key, value in target_header.items()
+                   if key not in base_header or canonical(base_header[key]) != canonical(value)},
+        'header_removed': sorted(base_header.keys() - target_header.keys()),
+        'added': added,
+        'changed': changed,
+        'removed': sorted(base_digests.keys() - seen),
+    }
+
+
+def apply_delta(base_path, delta):
+    """
+    把增量应用到基准manifest
+
+    记录按文件名排序（与 build_records 的输出顺序一致）。
+
+    Returns:
+        新的manifest字典
+
+    Raises:
+        ValueError: 格式版本不符，或基准/结果哈希与增量记录的不一致
+    """
+    if delta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"不支持的增量格式版本: {delta.get('format_version')}")
+
+    header = {}
+    base_records = hashlib.blake2b(digest_size=16)
+    removed = set(delta['removed'])
+    changed = {record['sequence']: record for record in delta['changed']}
+    files = []
+    for record in stream_manifest(base_path, header):
+        base_records.update(record_digest(record))
+        sequence = record['sequence']
+        if sequence not in removed:
+            files.append(changed.get(sequence, record))
+
+    if manifest_hash(header, base_records) != delta['base_hash']:
+        raise ValueError(f'基准manifest与增量不匹配: {base_path}')
+
+    files.extend(delta['added'])
+    files.sort(key=lambda record: record['filename'])
+
+    for key in delta['header_removed']:
+        header.pop(key, None)
+    header.update(delta['header'])
+
+    records = hashlib.blake2b(digest_size=16)
+    for record in files:
+        records.update(record_digest(record))
+    if manifest_hash(header, records) != delta['target_hash']:
+        raise ValueError('应用增量后的内容哈希与目标不一致')
+
+    return dict(header, files=files)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='manifest增量计算与应用')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    diff_parser = subparsers.add_parser('diff', help='计算增量')
+    diff_parser.add_argument('base', help='基准manifest')
+    diff_parser.add_argument('target', help='目标manifest')
+    diff_parser.add_argument('-o', '--output', default='assets/images/asset_manifest.delta.json',
+                             help='增量输出路径')
+
+    apply_parser = subparsers.add_parser('apply', help='应用增量')
+    apply_parser.add_argument('base', help='基准manifest')
+    apply_parser.add_argument('delta', help='增量文件')
+    apply_parser.add_argument('-o', '--output', required=True, help='输出manifest路径')
+
+    args = parser.parse_args()
+
+    if args.command == 'diff':
+        delta = compute_delta(args.base, args.target)
+        write_json(args.output, delta)
+        print(f"新增: {len(delta['added'])} 条, 变化: {len(delta['changed'])} 条, "
+              f"删除: {len(delta['removed'])} 条")
+        print(f"增量: {args.output} ({Path(args.output).stat().st_size} 字节, "
+              f"目标manifest {Path(args.target).stat().st_size} 字节)")
+    else:
+        with open(args.delta, 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        manifest = apply_delta(args.base, delta)
+        write_json(args.output, manifest, indent=2)
+        print(f"已应用增量: {args.output} ({len(manifest['files'])} 条记录)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+分片manifest（按需加载）
+把完整manifest拆成一个小的根索引和按某一编码位（默认风格）划分的分片文件。
+根索引只含编码定义和各分片的计数，首页只需读取根索引，分片在进入对应分类时再加载
+
+目录布局:
+    manifest_shards/index.json           根索引
+    manifest_shards/<编码位>_<代码>.json  分片，记录顺序与完整manifest一致
+
+用法:
+    python scripts/manifest_shards.py [--key style] [--manifest assets/images/asset_manifest.json]
+"""
+
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from collections import Counter
+
+from atomic_io import dumps_json, load_json, write_atomic
+
+SHARD_VERSION = 1
+
+# 可用作分片键的编码位，以及根索引中额外给出计数的编码位
+SHARD_KEYS = {'style': 'pose', 'pose': 'style'}
+
+INDEX_FILENAME = 'index.json'
+
+
+def shard_filename(key, code):
+    return f'{key}_{code}.json'
+
+
+def split_shards(files, key):
+    """按编码位 key 的代码分组，保持原有顺序；未知代码归入 'z'"""
+    shards = {}
+    for item in files:
+        code = item.get('encoding', {}).get(key, {}).get('code', 'z')
+        shards.setdefault(code, []).append(item)
+    return shards
+
+
+def write_shards(manifest, shard_dir, key='style'):
+    """
+    写出根索引与分片文件，删除不再存在的旧分片
+
+    内容未变的分片不会重写，便于增量发布；只删除上一版根索引中列出的分片，
+    目录中的其他文件保持不变。
+
+    Returns:
+        元组 (根索引路径, 写入的分片数)
+    """
+    if key not in SHARD_KEYS:
+        raise ValueError(f'不支持的分片键: {key} (可用: {", ".join(SHARD_KEYS)})')
+    facet = SHARD_KEYS[key]
+    definitions = manifest['encoding_definitions']
+
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    index_path = shard_dir / INDEX_FILENAME
+    previous = {entry['file'] for entry in load_json(index_path, {}).get('shards', [])}
+
+    entries = []
+    written = 0
+    for code, items in sorted(split_shards(manifest['files'], key).items()):
+        payload = dumps_json({
+            'version': SHARD_VERSION,
+            'shard_key': key,
+            'code': code,
+            'total_images': len(items),
+            'files': items,
+        })
+        path = shard_dir / shard_filename(key, code)
+        if not path.exists() or path.read_bytes() != payload:
+            write_atomic(path, payload)
+            written += 1
+
+        facet_counts = Counter(item['encoding'][facet]['code'] for item in items)
+        entries.append({
+            'code': code,
+            'name': definitions.get(key, {}).get(code, '未知'),
+            'file': path.name,
+            'count': len(items),
+            'bytes': len(payload),
+            'hash': hashlib.blake2b(payload, digest_size=8).hexdigest(),
+            f'{facet}_counts': dict(sorted(facet_counts.items())),
+        })
+
+    index = {
+        'version': SHARD_VERSION,
+        'manifest_version': manifest.get('version'),
+        'encoding_version': manifest.get('encoding_version'),
+        'total_images': len(manifest['files']),
+        'shard_key': key,
+        'encoding_definitions': definitions,
+        'shards': entries,
+    }
+    write_atomic(index_path, dumps_json(index))
+
+    # 新根索引写出后再删除旧分片，中断时根索引不会指向已删除的文件
+    for stale in previous - {entry['file'] for entry in entries} - {INDEX_FILENAME}:
+        # 只接受不含路径的文件名
+        if stale == Path(stale).name:
+            (shard_dir / stale).unlink(missing_ok=True)
+    return index_path, written
+
+
+def load_shard(shard_dir, key, code):
+    """读取单个分片的记录"""
+    with open(Path(shard_dir) / shard_filename(key, code), 'r', encoding='utf-8') as f:
+        return json.load(f)['files']
+
+
+def main():
+    """主函数：从现有JSON manifest生成分片"""
+    parser = argparse.ArgumentParser(description='生成分片manifest')
+    parser.add_argument('--manifest', type=str, default='assets/images/asset_manifest.json',
+                        help='完整manifest路径')
+    parser.add_argument('--key', type=str, default='style', choices=sorted(SHARD_KEYS),
+                        help='分片所依据的编码位 (默认style)')
+    parser.add_argument('--output-dir', type=str, default=None,
+                        help='分片目录 (默认与manifest同级的 manifest_shards/)')
+
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    shard_dir = Path(args.output_dir) if args.output_dir else manifest_path.parent / 'manifest_shards'
+    index_path, written = write_shards(manifest, shard_dir, args.key)
+
+    with open(index_path, 'r', encoding='utf-8') as f:
+        shards = json.load(f)['shards']
+    full_size = manifest_path.stat().st_size
+    index_size = index_path.stat().st_size
+    print(f"分片: {len(shards)} 个 (按 {args.key}), 重写 {written} 个")
+    print(f"根索引: {index_size} 字节, 完整manifest: {full_size} 字节 "
+          f"({full_size / max(index_size, 1):.0f}x)")
+    for entry in shards:
+        print(f"  {entry['file']}: {entry['count']} 张, {entry['bytes']} 字节")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+相似姿势 Top-K 邻居表（asset_manifest.nbr）
+离线计算每张图片在12位编码加权汉明距离下最相近的K张图片，
+使详情页的"相关推荐"变为常数时间查表
+
+相似度与 SmartRecommendationManager._calculateEncodingSimilarity 一致：
+各编码位取值相同时累加对应权重，低于 MIN_SCORE 的不作为邻居
+
+文件布局（小端）:
+    头部  魔数 'POZN', 版本(u16), 图片数(u32), K(u16), 序号字节数(u8)
+    邻居表  N×K 个序号（u16 或 u32，空位为全1）
+    分数表  N×K 个 u8 相似度分数
+
+用法:
+    python scripts/neighbor_table.py [assets/images/asset_manifest.nbr] [序号]
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from atomic_io import write_atomic
+
+MAGIC = b'POZN'
+FORMAT_VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sHIHBx')
+
+# 与 Dart 端相关推荐的权重保持一致
+SIMILARITY_WEIGHTS = {
+    'style': 25,
+    'clothing': 20,
+    'pose': 15,
+    'angle': 10,
+    'emotion': 10,
+    'scene': 8,
+    'hair': 7,
+    'action': 5,
+}
+
+# 相关推荐的最低分数
+MIN_SCORE = 30
+
+# 默认邻居数
+DEFAULT_K = 12
+
+
+def build_code_matrix(files, definitions):
+    """
+    构建 N×12 的 uint8 编码矩阵
+
+    未定义的代码统一归为 'z'，与 Dart 端按名称（均为"未知"）比较的结果一致。
+    """
+    positions = list(definitions)
+    codes = np.frombuffer(''.join(f['full_code'] for f in files).encode('ascii'),
+                          dtype=np.uint8).reshape(len(files), len(positions)).copy()
+    for col, position in enumerate(positions):
+        known = np.frombuffer(''.join(definitions[position]).encode('ascii'), dtype=np.uint8)
+        codes[~np.isin(codes[:, col], known), col] = ord('z')
+    return codes
+
+
+def compute_neighbors(codes, positions, k=DEFAULT_K, weights=SIMILARITY_WEIGHTS,
+                      min_score=MIN_SCORE, block_size=256):
+    """
+    分块计算每行的 Top-K 邻居
+
+    每块只占用 block_size × N 的分数矩阵，内存与总数呈线性关系。
+    分数相同时序号小者优先。
+
+    Returns:
+        元组 (邻居序号矩阵 N×K，空位为-1; 分数矩阵 N×K)
+    """
+    n = len(codes)
+    k = min(k, max(n - 1, 0))
+    columns = [(positions.index(p), w) for p, w in weights.items() if p in positions]
+
+    neighbors = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.uint8)
+    if k == 0:
+        return neighbors, scores
+
+    # 排序键: 分数优先，序号小者其次
+    tie_break = (n - 1 - np.arange(n, dtype=np.int64))
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block_scores = np.zeros((stop - start, n), dtype=np.int64)
+        for col, weight in columns:
+            block_scores += weight * (codes[start:stop, col, None] == codes[None, :, col])
+
+        rows = np.arange(stop - start)
+        block_scores[rows, rows + start] = -1
+        block_scores[block_scores < min_score] = -1
+
+        keys = block_scores * n + tie_break
+        top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        top_keys = np.take_along_axis(keys, top, axis=1)
+        order = np.argsort(-top_keys, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(block_scores, top, axis=1)
+
+        valid = top_scores >= 0
+        neighbors[start:stop] = np.where(valid, top, -1)
+        scores[start:stop] = np.where(valid, top_scores, 0)
+
+    return neighbors, scores
+
+
+def write_neighbors(path, neighbors, scores):
+    """写入邻居表"""
+    n, k = neighbors.shape
+    width = 2 if n < 0xFFFF else 4
+    dtype = np.dtype('<u2') if width == 2 else np.dtype('<u4')
+    table = np.where(neighbors < 0, np.iinfo(dtype).max, neighbors).astype(dtype)
+
+    write_atomic(path, HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, n, k, width)
+                 + table.tobytes() + scores.astype(np.uint8).tobytes())
+
+
+def read_neighbors(path):
+    """
+    读取邻居表
+
+    Returns:
+        元组 (邻居序号矩阵，空位为-1; 分数矩阵)
+    """
+    buf = Path(path).read_bytes()
+    magic, version, n, k, width = HEADER_STRUCT.unpack_from(buf, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f'不支持的邻居表: {path}')
+
+    dtype = np.dtype('<u2') if width == 2 else np.dtype('<u4')
+    offset = HEADER_STRUCT.size
+    table = np.frombuffer(buf, dtype=dtype, count=n * k, offset=offset).reshape(n, k)
+    scores = np.frombuffer(buf, dtype=np.uint8, count=n * k,
+                           offset=offset + n * k * width).reshape(n, k)
+    neighbors = np.where(table == np.iinfo(dtype).max, -1, table.astype(np.int64))
+    return neighbors, scores
+
+
+def related(neighbors, index, limit=6):
+    """查表获取某张图片的相关图片序号"""
+    row = neighbors[index]
+    return [int(i) for i in row[row >= 0][:limit]]
+
+
+if __name__ == '__main__':
+    nbr_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'assets/images/asset_manifest.nbr')
+    table, table_scores = read_neighbors(nbr_path)
+    print(f"{nbr_path}: {table.shape[0]} 张图片, K={table.shape[1]}, {nbr_path.stat().st_size} 字节")
+    probe = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    if 0 <= probe < len(table):
+        pairs = [(int(i), int(s)) for i, s in zip(table[probe], table_scores[probe]) if i >= 0]
+        print(f"  #{probe}: {pairs}")
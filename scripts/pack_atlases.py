@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+缩略图图集（sprite sheet）打包
+把缩略图按浏览顺序（风格、姿势、文件名）拼成固定 N×M 格的图集，
+并在manifest记录中写入所在图集及坐标，网格页只需加载一两张图集
+
+图集按 (风格, 姿势) 分组、组内分页，文件名固定为 <风格><姿势>_<页>，
+新增或修改图片只影响所在分组中其后的页；成员及参数签名未变的图集不会重建
+
+输出:
+    assets/images/atlases/<风格><姿势>_<页>.jpg   图集
+    assets/images/atlases/index.json             各图集的签名与成员数
+
+用法:
+    python scripts/pack_atlases.py [--cols 6] [--rows 8] [--codec jpeg] [--workers 8]
+"""
+
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from atomic_io import load_json, write_atomic, write_json
+from batching import imap_unordered_bounded
+from image_io import CODECS, DERIVATIVE_SPECS, encode_image, file_digest
+from tracing import span, traced
+
+ATLAS_VERSION = 1
+
+# 默认格子尺寸与缩略图规格一致
+DEFAULT_CELL = DERIVATIVE_SPECS['thumb']
+DEFAULT_COLS = 6
+DEFAULT_ROWS = 8
+
+ATLAS_DIR = Path('assets/images/atlases')
+INDEX_FILENAME = 'index.json'
+
+
+def browse_key(item):
+    """浏览顺序：风格、姿势、文件名"""
+    encoding = item['encoding']
+    return encoding['style']['code'], encoding['pose']['code'], item['filename']
+
+
+def source_path(item):
+    """优先使用已生成的缩略图作为图集源图"""
+    return item.get('derivatives', {}).get('thumb', item['asset_path'])
+
+
+def plan_atlases(files, per_atlas):
+    """
+    按浏览顺序分组分页
+
+    Returns:
+        列表 [(图集名, [记录, ...])]
+    """
+    groups = {}
+    for item in sorted(files, key=browse_key):
+        style, pose, _ = browse_key(item)
+        groups.setdefault(style + pose, []).append(item)
+
+    plan = []
+    for group, items in groups.items():
+        for page, start in enumerate(range(0, len(items), per_atlas)):
+            plan.append((f'{group}_{page:02d}', items[start:start + per_atlas]))
+    return plan
+
+
+def atlas_signature(items, cell, cols, rows, codec, quality):
+    """图集签名：成员内容哈希与打包参数"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([ATLAS_VERSION, list(cell), cols, rows, codec, quality]).encode('utf-8'))
+    for item in items:
+        h.update((item.get('content_hash') or file_digest(source_path(item))).encode('ascii'))
+        h.update(source_path(item).encode('utf-8'))
+    return h.hexdigest()
+
+
+def render_atlas(args):
+    """
+    拼接并写出一张图集
+
+    Returns:
+        元组 (图集名, 是否成功, 错误信息)
+    """
+    name, out_path, sources, cell, cols, codec, quality = args
+    try:
+        with span('atlas_render', name):
+            rows = (len(sources) + cols - 1) // cols
+            sheet = Image.new('RGB', (cell[0] * cols, cell[1] * rows), (255, 255, 255))
+            for i, src in enumerate(sources):
+                with Image.open(src) as img:
+                    if img.format == 'JPEG':
+                        img.draft('RGB', cell)
+                    tile = ImageOps.fit(img.convert('RGB'), cell, Image.Resampling.LANCZOS)
+                sheet.paste(tile, ((i % cols) * cell[0], (i // cols) * cell[1]))
+
+            write_atomic(out_path, encode_image(sheet, codec, quality))
+        return name, True, None
+    except Exception as e:
+        return name, False, str(e)
+
+
+def render_batch(batch):
+    return [render_atlas(args) for args in batch]
+
+
+def load_index(atlas_dir):
+    index = load_json(Path(atlas_dir) / INDEX_FILENAME, {})
+    return index if index.get('version') == ATLAS_VERSION else {}
+
+
+@traced('atlas')
+def apply_atlases(data, atlas_dir=ATLAS_DIR, cell=DEFAULT_CELL, cols=DEFAULT_COLS, rows=DEFAULT_ROWS,
+                  codec='jpeg', quality=80, workers=8, force=False):
+    """
+    打包图集并为内存中的manifest添加 atlas 坐标字段
+
+    Returns:
+        元组 (图集总数, 重建数)
+    """
+    atlas_dir = Path(atlas_dir)
+    atlas_dir.mkdir(parents=True, exist_ok=True)
+    ext = CODECS[codec]['ext']
+
+    previous = load_index(atlas_dir).get('atlases', {})
+    atlases = {}
+    tasks = []
+    for name, items in plan_atlases(data.get('files', []), cols * rows):
+        filename = name + ext
+        signature = atlas_signature(items, cell, cols, rows, codec, quality)
+        atlases[filename] = {'signature': signature, 'count': len(items)}
+        if force or previous.get(filename, {}).get('signature') != signature \
+                or not (atlas_dir / filename).exists():
+            tasks.append((filename, atlas_dir / filename, [source_path(item) for item in items],
+                          cell, cols, codec, quality))
+
+        for i, item in enumerate(items):
+            item['atlas'] = {
+                'file': (atlas_dir / filename).as_posix(),
+                'x': (i % cols) * cell[0],
+                'y': (i // cols) * cell[1],
+                'w': cell[0],
+                'h': cell[1],
+            }
+
+    failed = set()
+    if tasks:
+        print(f"  打包图集: {len(tasks)} 张 (共 {len(atlases)} 张)")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for filename, success, error in imap_unordered_bounded(executor, render_batch, tasks,
+                                                                    1, workers * 2):
+                if not success:
+                    print(f"  ✗ {filename}: {error}")
+                    failed.add(filename)
+
+    # 重建失败时保留旧图集及其索引条目（签名不变，下次运行重试）；
+    # 旧图集的布局与本次成员不一致，相应记录不写坐标
+    for filename in failed:
+        if filename in previous and (atlas_dir / filename).exists():
+            atlases[filename] = previous[filename]
+        else:
+            del atlases[filename]
+    for item in data.get('files', []):
+        if 'atlas' in item and Path(item['atlas']['file']).name in failed:
+            del item['atlas']
+
+    index = {
+        'version': ATLAS_VERSION,
+        'cell': list(cell),
+        'grid': [cols, rows],
+        'codec': codec,
+        'quality': quality,
+        'atlases': atlases,
+    }
+    write_json(atlas_dir / INDEX_FILENAME, index, indent=2)
+
+    # 只删除上一版索引中列出、本次不再需要的图集，目录中的其他文件保持不变
+    for stale in previous.keys() - atlases.keys():
+        if stale == Path(stale).name and stale != INDEX_FILENAME:
+            (atlas_dir / stale).unlink(missing_ok=True)
+
+    return len(atlases), len(tasks)
+
+
+def main():
+    """主函数：为现有 asset_manifest.json 打包图集"""
+    parser = argparse.ArgumentParser(description='缩略图图集打包')
+    parser.add_argument('--manifest', type=str, default='assets/images/asset_manifest.json',
+                        help='manifest路径')
+    parser.add_argument('--output-dir', type=str, default=str(ATLAS_DIR),
+                        help=f'图集目录 (默认{ATLAS_DIR})')
+    parser.add_argument('--cols', type=int, default=DEFAULT_COLS,
+                        help=f'每张图集的列数 (默认{DEFAULT_COLS})')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS,
+                        help=f'每张图集的行数 (默认{DEFAULT_ROWS})')
+    parser.add_argument('--cell', type=str, default='x'.join(map(str, DEFAULT_CELL)),
+                        help='格子尺寸 宽x高 (默认%(default)s)')
+    parser.add_argument('--codec', type=str, default='jpeg', choices=sorted(CODECS),
+                        help='图集编码格式 (默认jpeg)')
+    parser.add_argument('--quality', type=int, default=80,
+                        help='图集编码质量 (默认80)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='并行处理进程数 (默认8)')
+    parser.add_argument('--force', action='store_true',
+                        help='忽略签名，重建全部图集')
+
+    args = parser.parse_args()
+
+    cell = tuple(int(v) for v in args.cell.lower().split('x'))
+
+    manifest_path = Path(args.manifest)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    total, rebuilt = apply_atlases(data, Path(args.output_dir), cell, args.cols, args.rows,
+                                   args.codec, args.quality, args.workers, args.force)
+
+    write_json(manifest_path, data, indent=2)
+
+    print(f"完成！图集 {total} 张，重建 {rebuilt} 张，"
+          f"{sum(1 for item in data['files'] if 'atlas' in item)} 张图片已写入坐标")
+
+
+if __name__ == '__main__':
+    main()
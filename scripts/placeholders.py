@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+为manifest中的每张图片生成 BlurHash 占位图
+网格在图片解码前即可绘制模糊预览；按内容哈希缓存，未变化的图片不会重复计算
+
+用法:
+    python scripts/placeholders.py [--workers 8]
+"""
+
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from atomic_io import write_json
+from image_io import load_resized
+from content_cache import compute_cached, params_key
+from tracing import span, traced
+
+# BlurHash 的 base83 字符表
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+# 计算占位图时的解码尺寸（最大边长）
+SAMPLE_SIZE = 32
+
+# 占位图缓存：{内容哈希: BlurHash}
+CACHE_PATH = Path('assets/images/.placeholder_cache.json')
+
+# 算法版本，修改计算方式时递增使缓存失效
+PLACEHOLDER_VERSION = 1
+
+
+def encode83(value, length):
+    """base83 定长编码"""
+    return ''.join(BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def srgb_to_linear(values):
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(value):
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(pixels, components_x=4, components_y=3):
+    """
+    计算 BlurHash
+
+    Args:
+        pixels: (高, 宽, 3) 的 uint8 RGB 数组
+        components_x, components_y: 水平/垂直方向的余弦分量数 (1-9)
+
+    Returns:
+        BlurHash 字符串
+    """
+    height, width = pixels.shape[:2]
+    linear = srgb_to_linear(pixels.astype(np.float64))
+
+    basis_x = np.cos(np.pi * np.outer(np.arange(components_x), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(components_y), np.arange(height)) / height)
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors[1:] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+
+    result = encode83((components_x - 1) + (components_y - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, int(np.abs(ac).max() * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += encode83(0, 1)
+
+    r, g, b = (linear_to_srgb(c) for c in dc)
+    result += encode83((r << 16) + (g << 8) + b, 4)
+
+    quantised = np.clip(np.floor(np.sign(ac) * np.sqrt(np.abs(ac / max_value)) * 9 + 9.5), 0, 18)
+    for qr, qg, qb in quantised.astype(int).tolist():
+        result += encode83(qr * 19 * 19 + qg * 19 + qb, 2)
+    return result
+
+
+def make_placeholder(img_path):
+    """以 draft 模式解码缩小图并计算 BlurHash（竖图使用 3×4 分量）"""
+    with Image.open(img_path) as img:
+        small = load_resized(img, SAMPLE_SIZE, draft=True)
+        pixels = np.asarray(small.convert('RGB'))
+    height, width = pixels.shape[:2]
+    components = (3, 4) if height > width else (4, 3)
+    with span('blurhash', img_path):
+        return blurhash(pixels, *components)
+
+
+def cache_key():
+    return params_key({'version': PLACEHOLDER_VERSION, 'sample_size': SAMPLE_SIZE})
+
+
+@traced('placeholder')
+def apply_placeholders(data, workers=8, chunksize=32, cache_path=CACHE_PATH):
+    """
+    为内存中的manifest添加 blurhash 字段
+
+    需要记录中的 content_hash（见 generate_encoded_manifest.read_image_info）；
+    缓存命中的图片不会被解码。
+
+    Returns:
+        新计算的图片数
+    """
+    files = data.get('files', [])
+    cache, computed = compute_cached(files, make_placeholder, cache_path, cache_key(), '计算占位图',
+                                     workers, chunksize)
+
+    for item in files:
+        placeholder = cache.get(item.get('content_hash'))
+        if placeholder:
+            item['blurhash'] = placeholder
+
+    return computed
+
+
+def main():
+    """主函数：为现有 asset_manifest.json 添加占位图"""
+    parser = argparse.ArgumentParser(description='生成BlurHash占位图')
+    parser.add_argument('--manifest', type=str, default='assets/images/asset_manifest.json',
+                        help='manifest路径')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='并行处理进程数 (默认8)')
+
+    args = parser.parse_args()
+
+    manifest_path = Path(args.manifest)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    computed = apply_placeholders(data, workers=args.workers)
+    write_json(manifest_path, data, indent=2)
+
+    print(f"完成！新计算 {computed} 张，共 {sum(1 for f in data['files'] if 'blurhash' in f)} 张含占位图")
+
+
+if __name__ == '__main__':
+    main()
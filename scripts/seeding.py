@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+与进程无关的确定性随机种子
+内置 hash() 受 PYTHONHASHSEED 随机化影响，每次运行结果不同；
+这里改用 blake2b，保证同一照片在任何机器、任何进程中得到相同的标签
+"""
+
+import hashlib
+
+# 种子取值范围（与原 hash() % 10000 保持一致）
+SEED_MODULO = 10000
+
+
+def stable_seed(key, modulo=SEED_MODULO):
+    """由字符串计算稳定种子"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % modulo
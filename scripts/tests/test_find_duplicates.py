@@ -0,0 +1,17 @@
+from find_duplicates import cluster
+
+
+def test_chain_members_stay_within_radius_of_keeper():
+    # 0-1、1-2、2-3 各自相近，但 2 与 0 不相近：2 成为新的保留图
+    pairs = {(0, 1, 3), (1, 2, 3), (2, 3, 3)}
+    assert cluster(pairs) == [[0, 1], [2, 3]]
+
+
+def test_member_joins_lowest_keeper():
+    pairs = {(0, 2, 1), (1, 2, 1), (0, 1, 4)}
+    assert cluster(pairs) == [[0, 1, 2]]
+
+
+def test_keeper_without_free_neighbors_is_not_a_cluster():
+    pairs = {(0, 1, 2), (1, 5, 2)}
+    assert cluster(pairs) == [[0, 1]]
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import generate_encoded_manifest
+from generate_encoded_manifest import (ENCODING_CODES, build_manifest, encoding_view,
+                                       parse_encoded_filenames, write_manifest)
+from manifest_binary import BinaryManifest, verify_round_trip, write_binary_manifest
+
+
+def make_records(names):
+    parsed = parse_encoded_filenames(names)
+    records = []
+    for i, name in enumerate(names):
+        sequence, encoding = encoding_view(parsed, i)
+        if sequence is None:
+            continue
+        records.append({
+            'asset_path': f'assets/images/pose_samples/{name}',
+            'filename': name,
+            'sequence': sequence,
+            'encoding': encoding,
+            'full_code': str(parsed.code_text[i]),
+        })
+    return records
+
+
+MIXED_NAMES = [
+    '0001-eaabbgcbbegd.jpg',
+    '0002-zzzzzzzzzzzz.webp',
+    '12345-aaaaaaaaaaaa.jpg',
+    '00-bbbbbbbbbbbb.jpg',
+    '4294967296-cccccccccccc.jpg',
+    'img7-dddddddddddd.avif',
+    '序号-eeeeeeeeeeee.jpg',
+]
+
+
+def test_round_trip_mixed_sequences(tmp_path):
+    files = make_records(MIXED_NAMES)
+    path = tmp_path / 'asset_manifest.bin'
+    write_binary_manifest(path, files, ENCODING_CODES)
+
+    assert verify_round_trip(path, files, ENCODING_CODES) == 0
+    with BinaryManifest(path) as manifest:
+        assert [manifest.record(i)[2] for i in range(len(manifest))] == MIXED_NAMES
+        assert [manifest.record(i)[0] for i in range(len(manifest))] == [f['sequence'] for f in files]
+
+
+def test_filter_matches_json(tmp_path):
+    files = make_records(MIXED_NAMES)
+    path = tmp_path / 'asset_manifest.bin'
+    write_binary_manifest(path, files, ENCODING_CODES)
+
+    with BinaryManifest(path) as manifest:
+        expected = [i for i, f in enumerate(files) if f['full_code'][0] == 'a']
+        assert manifest.filter(shot_size='a') == expected
+        assert manifest.code_at(2, 'style') == 'a'
+
+
+def test_empty_manifest(tmp_path):
+    path = tmp_path / 'asset_manifest.bin'
+    write_binary_manifest(path, [], ENCODING_CODES)
+    with BinaryManifest(path) as manifest:
+        assert len(manifest) == 0
+        assert manifest.definitions == ENCODING_CODES
+
+
+def test_non_ascii_code_is_invalid():
+    parsed = parse_encoded_filenames(['0001-eaabbgcbbeg好.jpg', '0002-eaabbgcbbegd.jpg'])
+    assert parsed.valid.tolist() == [False, True]
+    assert not parsed.codes[0].any()
+    assert make_records(['0001-eaabbgcbbeg好.jpg']) == []
+
+
+def test_write_manifest_mixed_widths(tmp_path):
+    files = make_records(['0001-eaabbgcbbegd.jpg', '12345-aaaaaaaaaaaa.jpg'])
+    output_path = tmp_path / 'asset_manifest.json'
+    write_manifest(build_manifest(files), output_path)
+
+    assert json.loads(output_path.read_text(encoding='utf-8'))['files'] == files
+    assert verify_round_trip(output_path.with_suffix('.bin'), files, ENCODING_CODES) == 0
+
+
+def test_write_manifest_keeps_json_on_failure(tmp_path, monkeypatch):
+    output_path = tmp_path / 'asset_manifest.json'
+    write_manifest(build_manifest(make_records(['0001-eaabbgcbbegd.jpg'])), output_path)
+    before = output_path.read_bytes()
+
+    def fail(*args):
+        raise RuntimeError('写入失败')
+
+    monkeypatch.setattr(generate_encoded_manifest, 'write_binary_manifest', fail)
+    with pytest.raises(RuntimeError):
+        write_manifest(build_manifest(make_records(['0002-aaaaaaaaaaaa.jpg'])), output_path)
+
+    assert output_path.read_bytes() == before
+    assert not output_path.with_name(output_path.name + '.tmp').exists()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+共享的计时与追踪工具
+记录每张图片、每个阶段的耗时和输入/输出字节数，写入 JSON-lines 追踪文件，
+并汇总各阶段的 p50/p95/p99
+
+默认关闭，开销只有一次环境变量判断。设置环境变量 POSE_TRACE=<追踪文件>
+（或在支持的脚本中使用 --trace）后启用；POSE_TRACE_PROFILE=1（--profile）
+额外为每个进程开启 cProfile 和 tracemalloc
+
+每个进程把事件追加到进程内队列，并写入独立的分片文件 <追踪文件>.<pid>，
+进程池中的工作进程无需加锁或回传结果；主进程退出时合并分片并打印汇总
+
+用法:
+    POSE_TRACE=trace.jsonl python scripts/generate_encoded_manifest.py
+    python scripts/compress_images.py --trace trace.jsonl --profile
+    python scripts/tracing.py trace.jsonl          # 重新汇总已有追踪文件
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from multiprocessing import util
+from pathlib import Path
+
+import numpy as np
+
+TRACE_ENV = 'POSE_TRACE'
+PROFILE_ENV = 'POSE_TRACE_PROFILE'
+OWNER_ENV = 'POSE_TRACE_OWNER'
+
+# 队列积累到该条数时写入分片文件
+FLUSH_EVENTS = 4096
+
+_state = None
+
+
+class _ProcessTrace:
+    """单个进程的追踪状态"""
+
+    def __init__(self, path, profile):
+        self.pid = os.getpid()
+        self.path = Path(path)
+        self.part_path = Path(f'{path}.{self.pid}')
+        self.events = deque()
+        self.flushing = threading.Lock()
+        self.profiler = None
+        if profile:
+            import cProfile
+            import tracemalloc
+            tracemalloc.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        # multiprocessing 的退出钩子在进程池子进程中同样会执行（atexit 不会）
+        util.Finalize(None, _finalize, args=(self,), exitpriority=100)
+
+    def flush(self):
+        # 非阻塞：其他线程正在写出时直接返回，事件留在队列中下次写出
+        if not self.flushing.acquire(blocking=False):
+            return
+        try:
+            with open(self.part_path, 'a', encoding='utf-8') as f:
+                while self.events:
+                    f.write(json.dumps(self.events.popleft(), ensure_ascii=False) + '\n')
+        finally:
+            self.flushing.release()
+
+
+def _finalize(trace):
+    if trace.profiler:
+        import tracemalloc
+        trace.profiler.disable()
+        trace.profiler.dump_stats(f'{trace.path}.{trace.pid}.prof')
+        current, peak = tracemalloc.get_traced_memory()
+        trace.events.append({'stage': 'process', 'pid': trace.pid, 'ts': time.time(),
+                             'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+                             'mem_current': current, 'mem_peak': peak})
+    trace.flush()
+    if os.environ.get(OWNER_ENV) == str(trace.pid):
+        stats = summarize(trace.path)
+        if stats:
+            print_summary(stats, trace.path)
+
+
+def _get_state():
+    """返回当前进程的追踪状态；未启用时返回None（fork 出的子进程重新初始化）"""
+    global _state
+    if _state is not None and _state.pid == os.getpid():
+        return _state
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    _state = _ProcessTrace(path, os.environ.get(PROFILE_ENV) == '1')
+    return _state
+
+
+def _trace_files(path, suffix=''):
+    """
+    追踪文件的各进程分片 <追踪文件>.<pid>（suffix='.prof' 时为性能剖析文件）
+
+    只匹配进程号部分全为数字的文件名，不会误选同名前缀的其他文件。
+    """
+    prefix = f'{path.name}.'
+    return sorted(p for p in path.parent.glob(f'{path.name}.*{suffix}')
+                  if p.name[len(prefix):len(p.name) - len(suffix)].isdigit())
+
+
+def enable(path, profile=False):
+    """
+    启用追踪（须在创建进程池之前调用，子进程通过环境变量继承）
+
+    清除上次的追踪文件、分片与性能剖析文件。
+    """
+    path = Path(path).resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for old in [path, *_trace_files(path), *_trace_files(path, '.prof')]:
+        old.unlink(missing_ok=True)
+    os.environ[TRACE_ENV] = str(path)
+    os.environ[PROFILE_ENV] = '1' if profile else '0'
+    os.environ[OWNER_ENV] = str(os.getpid())
+    return _get_state()
+
+
+def enabled():
+    return _get_state() is not None
+
+
+@contextmanager
+def span(stage, item=None, bytes_in=0):
+    """
+    记录一段代码的耗时
+
+    产出的字典可在代码块内补充 bytes_in / bytes_out 等字段。
+    """
+    trace = _get_state()
+    record = {'bytes_in': bytes_in, 'bytes_out': 0}
+    if trace is None:
+        yield record
+        return
+    start = time.perf_counter()
+    ts = time.time()
+    try:
+        yield record
+    finally:
+        record.update(stage=stage, pid=trace.pid, ts=ts, seconds=time.perf_counter() - start)
+        if item is not None:
+            record['item'] = str(item)
+        trace.events.append(record)
+        if len(trace.events) >= FLUSH_EVENTS:
+            trace.flush()
+
+
+def traced(stage):
+    """装饰器：以 stage 为名记录每次调用的耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def flush():
+    """立即写出当前进程的事件"""
+    trace = _get_state()
+    if trace is not None:
+        trace.flush()
+
+
+def merge_parts(path):
+    """把各进程的分片追加到追踪文件并删除分片"""
+    path = Path(path)
+    parts = _trace_files(path)
+    if not parts:
+        return
+    with open(path, 'a', encoding='utf-8') as out:
+        for part in parts:
+            with open(part, 'r', encoding='utf-8') as f:
+                for line in f:
+                    out.write(line)
+            part.unlink()
+
+
+def summarize(path):
+    """
+    合并分片并按阶段汇总
+
+    Returns:
+        {阶段: {count, total, p50, p95, p99, bytes_in, bytes_out}}
+    """
+    merge_parts(path)
+    by_stage = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                event = json.loads(line)
+                if event['stage'] == 'process':
+                    continue
+                entry = by_stage.setdefault(event['stage'], ([], [0, 0]))
+                entry[0].append(event['seconds'])
+                entry[1][0] += event.get('bytes_in', 0)
+                entry[1][1] += event.get('bytes_out', 0)
+    except FileNotFoundError:
+        return {}
+
+    stats = {}
+    for stage, (seconds, (bytes_in, bytes_out)) in by_stage.items():
+        values = np.array(seconds)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        stats[stage] = {
+            'count': len(values),
+            'total': float(values.sum()),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+        }
+    return stats
+
+
+def print_summary(stats, path=None):
+    """打印各阶段汇总（按总耗时降序，时间单位毫秒）"""
+    print("-" * 50)
+    print(f"追踪汇总{f' ({path})' if path else ''}:")
+    print(f"  {'阶段':<14}{'次数':>8}{'总计(秒)':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'输入MB':>9}{'输出MB':>9}")
+    for stage, s in sorted(stats.items(), key=lambda kv: -kv[1]['total']):
+        print(f"  {stage:<14}{s['count']:>8}{s['total']:>10.2f}"
+              f"{s['p50'] * 1000:>9.1f}{s['p95'] * 1000:>9.1f}{s['p99'] * 1000:>9.1f}"
+              f"{s['bytes_in'] / (1024 * 1024):>9.2f}{s['bytes_out'] / (1024 * 1024):>9.2f}")
+
+
+# 直接通过环境变量启用时，导入本模块的第一个进程负责合并与汇总
+if os.environ.get(TRACE_ENV) and not os.environ.get(OWNER_ENV):
+    os.environ[OWNER_ENV] = str(os.getpid())
+
+
+if __name__ == '__main__':
+    trace_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'trace.jsonl')
+    print_summary(summarize(trace_path), trace_path)
@@ -7,16 +7,14 @@
 import json
 from pathlib import Path
 
-def update_manifest_with_simple_tags():
-    """更新 asset_manifest.json，使用简化的标签系统"""
-    manifest_path = Path('assets/images/asset_manifest.json')
-    
-    with open(manifest_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+from tracing import traced
+
+
+@traced('simple_tags')
+def apply_simple_tags(data):
+    """为内存中的manifest写入简化标签并删除 pose_tags"""
     files = data.get('files', [])
-    print(f"正在更新 {len(files)} 张照片的标签...")
-    
+
     # 为每张照片添加简化标签
     for item in files:
         category = item.get('category', '')
@@ -44,18 +42,29 @@ def update_manifest_with_simple_tags():
                     type_key = '_'.join(parts[wear_idx-1:wear_idx+1])
                     clothing_type = get_clothing_type(type_key)
         
-        # 简化的标签，只保留确定的信息
-        simple_tags = {
+        # 简化的标签，只保留确定的信息；合并到已有字段，保留景别等其他阶段的标签
+        item.setdefault('simple_tags', {}).update({
             'style': style_name,
             'clothing_type': clothing_type,
             'category': category,
-        }
+        })
         
         # 替换原有的 pose_tags
-        item['simple_tags'] = simple_tags
         # 删除不准确的 pose_tags
         if 'pose_tags' in item:
             del item['pose_tags']
+
+def update_manifest_with_simple_tags():
+    """更新 asset_manifest.json，使用简化的标签系统"""
+    manifest_path = Path('assets/images/asset_manifest.json')
+    
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    files = data.get('files', [])
+    print(f"正在更新 {len(files)} 张照片的标签...")
+    
+    apply_simple_tags(data)
     
     # 保存更新后的 manifest
     with open(manifest_path, 'w', encoding='utf-8') as f:
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+all_subclusters 离线索引
+桌面端 PoseImageManager 每次启动都递归 listSync 整个 all_subclusters 目录来发现分类；
+本脚本预先生成 分类 → 照片路径 的索引文件，应用只需读取一个文件
+
+- 多线程 os.scandir 并行遍历
+- 记录每个目录的 mtime；再次运行时只重新列出 mtime 变化的目录，
+  未变化的目录直接复用上次的文件和子目录列表（仍会 stat 以发现深层变化）
+- 应用端按记录的目录 mtime 判断索引是否过期，过期时回退为完整扫描
+- 分类规则与 PoseImageManager._scanDirectory 一致：
+  第一级目录去掉 '_subclusters' + '/' + 第二级路径部分
+
+用法:
+    python tools/index_subclusters.py [--root .../all_subclusters] [--workers 8]
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from atomic_io import load_json, write_json  # noqa: E402
+
+ROOT_DIR = Path("/Users/jason/Documents/TRAE-app/post/post/res/assert/all_subclusters")
+
+INDEX_FILENAME = 'subcluster_index.json'
+INDEX_VERSION = 1
+
+PHOTO_EXTENSION = '.jpg'
+
+
+def scan_directory(path, rel, cached):
+    """
+    列出单个目录；mtime 未变化时复用缓存
+
+    Returns:
+        元组 (相对路径, 目录条目 {mtime_ns, files, subdirs}, 是否重新列出)
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError as e:
+        print(f"⚠️  无法访问目录: {path} ({e})")
+        return rel, None, False
+    if cached and cached['mtime_ns'] == mtime_ns:
+        return rel, cached, False
+
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith(PHOTO_EXTENSION) and entry.is_file():
+                    files.append(entry.name)
+    except OSError as e:
+        print(f"⚠️  无法读取目录: {path} ({e})")
+        return rel, None, False
+    return rel, {'mtime_ns': mtime_ns, 'files': sorted(files), 'subdirs': sorted(subdirs)}, True
+
+
+def walk_tree(root, previous, workers=8):
+    """
+    并行遍历目录树
+
+    Returns:
+        元组 ({相对路径: 目录条目}, 重新列出的目录数)
+    """
+    directories = {}
+    rescanned = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(scan_directory, root, '', previous.get(''))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel, entry, listed = future.result()
+                if entry is None:
+                    continue
+                directories[rel] = entry
+                rescanned += listed
+                for name in entry['subdirs']:
+                    child = f'{rel}/{name}' if rel else name
+                    pending.add(executor.submit(scan_directory, os.path.join(root, child),
+                                                child, previous.get(child)))
+    return directories, rescanned
+
+
+def photo_category(rel_path):
+    """与 PoseImageManager._scanDirectory 相同的分类规则；不足两级时返回None"""
+    parts = rel_path.split('/')
+    if len(parts) < 2:
+        return None
+    return f"{parts[0].replace('_subclusters', '')}/{parts[1]}"
+
+
+def build_categories(directories):
+    """由目录条目生成 {分类: [相对路径]}（排序，结果稳定）"""
+    categories = {}
+    for rel in sorted(directories):
+        for name in directories[rel]['files']:
+            path = f'{rel}/{name}' if rel else name
+            category = photo_category(path)
+            if category:
+                categories.setdefault(category, []).append(path)
+    return dict(sorted(categories.items()))
+
+
+def load_index(index_path, root):
+    index = load_json(index_path, {})
+    if index.get('version') != INDEX_VERSION or index.get('root') != str(root):
+        return {}
+    return index.get('directories', {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成 all_subclusters 离线索引')
+    parser.add_argument('--root', type=str, default=str(ROOT_DIR), help='all_subclusters 目录')
+    parser.add_argument('--output', type=str, default=None,
+                        help=f'索引输出路径 (默认: 根目录下的 {INDEX_FILENAME})')
+    parser.add_argument('--workers', type=int, default=8, help='遍历线程数 (默认8)')
+    parser.add_argument('--full', action='store_true', help='忽略上次的索引，全部重新列出')
+
+    args = parser.parse_args()
+
+    root = Path(args.root).resolve()
+    if not root.is_dir():
+        print(f"⚠️  路径不存在: {root}")
+        return
+    index_path = Path(args.output) if args.output else root / INDEX_FILENAME
+
+    start = time.perf_counter()
+    previous = {} if args.full else load_index(index_path, root)
+    directories, rescanned = walk_tree(str(root), previous, args.workers)
+    categories = build_categories(directories)
+
+    index = {
+        'version': INDEX_VERSION,
+        'root': str(root),
+        'generated_at': int(time.time()),
+        'total_images': sum(len(paths) for paths in categories.values()),
+        'categories': categories,
+        'directories': directories,
+    }
+    write_json(index_path, index)
+    # 替换索引会更新所在目录（默认为根目录）的修改时间；刷新索引文件的修改时间，
+    # 使应用端可以按"根目录不晚于索引文件"判断根目录在索引生成后没有变化
+    os.utime(index_path)
+
+    print(f"目录: {len(directories)} 个, 重新列出 {rescanned} 个 ({time.perf_counter() - start:.2f} 秒)")
+    print(f"分类: {len(categories)} 个, 照片: {index['total_images']} 张")
+    print(f"📋 索引已生成: {index_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,88 +1,250 @@
 #!/usr/bin/env python3
 """
 照片样本选择脚本
-功能：从4646张照片中选择代表性样本（约100张）内置到应用中
+功能：从源照片库中选择代表性样本（约100张）内置到应用中
+
+- 多线程 os.scandir 并行遍历目录，边遍历边采样，不保存完整路径列表
+- 按12位编码的每个 (编码位, 代码) 分层，每层用哈希键的 bottom-k 水塘采样
+  （结果与遍历顺序无关，同一种子可复现）；文件名无法解析的照片按所在分类目录分层
+- 最终贪心地从覆盖最少的层中补选，使各编码位的取值都得到代表；
+  导入后文件名相同的照片只选一张，避免互相覆盖
+- 导入时先尝试 reflink，失败再复制，在线程池中并行执行；
+  --hardlink 时改为硬链接（与源照片库共享数据，之后原地压缩会改动源照片）
+
+用法:
+    python tools/select_sample_photos.py [--source 源目录] [--output 输出目录] [--count 80]
 """
 
 import os
+import sys
+import json
+import heapq
 import shutil
-import random
+import hashlib
+import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from generate_encoded_manifest import POSITIONS, parse_encoded_filenames  # noqa: E402
 
 SOURCE_DIR = Path("/Users/jason/Documents/TRAE-app/post/post/res/糖水片美姿/_姿势参考系统")
 OUTPUT_DIR = Path("/Users/jason/Documents/TRAE-app/post/post/pose_reference_app/assets/images/pose_samples")
 
 TARGET_COUNT = 80
 
-CATEGORIES = {
-    "modern_standing": ("现代清新/站姿", 10),
-    "modern_sitting": ("现代清新/坐姿", 10),
-    "modern_dynamic": ("现代清新/动态", 10),
-    "modern_interaction": ("现代清新/互动", 10),
-    "ancient_standing": ("古风汉服/站姿", 10),
-    "ancient_sitting": ("古风汉服/坐姿", 10),
-    "ancient_dynamic": ("古风汉服/动态", 10),
-    "ancient_interaction": ("古风汉服/互动", 10),
-}
-
-def collect_photos(category_path):
-    photos = []
-    for root, dirs, files in os.walk(category_path):
-        for file in files:
-            if file.endswith('.jpg'):
-                photos.append(os.path.join(root, file))
-    return photos
-
-def select_samples():
-    selected = []
-    
-    print(f"目标选择 {TARGET_COUNT} 张代表性照片\n")
-    
-    for category_key, (category_path, count) in CATEGORIES.items():
-        full_path = SOURCE_DIR / category_path
-        if not full_path.exists():
-            print(f"⚠️  路径不存在: {full_path}")
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg')
+
+# Linux 的 FICLONE ioctl（btrfs/xfs 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+
+def scan_directory(path):
+    """列出单个目录，返回 (照片路径列表, 子目录列表)"""
+    photos, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(PHOTO_EXTENSIONS) and entry.is_file():
+                    photos.append(entry.path)
+    except OSError as e:
+        print(f"⚠️  无法读取目录: {path} ({e})")
+    return photos, subdirs
+
+
+def walk_photos(root, workers=8):
+    """
+    并行遍历目录树
+
+    Yields:
+        每个目录中的照片路径列表（按完成顺序）
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(scan_directory, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                photos, subdirs = future.result()
+                pending.update(executor.submit(scan_directory, d) for d in subdirs)
+                if photos:
+                    yield photos
+
+
+def sample_key(rel_path, seed):
+    """由种子和相对路径得到稳定的采样键"""
+    digest = hashlib.blake2b(rel_path.encode('utf-8'), digest_size=8, key=str(seed).encode('utf-8'))
+    return int.from_bytes(digest.digest(), 'big')
+
+
+def directory_category(rel_path):
+    """无法解析编码时使用的分类：前两级目录（如 现代清新_站姿）"""
+    parts = Path(rel_path).parts[:-1]
+    return '_'.join(parts[:2]) if parts else '根目录'
+
+
+def photo_strata(photos, source_dir, positions):
+    """
+    计算一个目录中各照片所属的层
+
+    Yields:
+        (相对路径, 层元组)
+    """
+    parsed = parse_encoded_filenames(os.path.basename(p) for p in photos)
+    columns = [POSITIONS.index(p) for p in positions]
+    for i, path in enumerate(photos):
+        rel_path = os.path.relpath(path, source_dir)
+        if parsed.valid[i]:
+            codes = parsed.codes[i]
+            yield rel_path, tuple((POSITIONS[c], chr(codes[c])) for c in columns)
+        else:
+            yield rel_path, (('category', directory_category(rel_path)),)
+
+
+def select_samples(source_dir=SOURCE_DIR, target=TARGET_COUNT, positions=POSITIONS, workers=8, seed=42):
+    """
+    分层采样
+
+    每层只保留采样键最小的 target 张（bottom-k 水塘），内存只与层数和目标数有关。
+
+    Returns:
+        样本列表 [{source, original_rel, strata}]
+    """
+    reservoirs = {}
+    population = {}
+    scanned = 0
+
+    print(f"目标选择 {target} 张代表性照片\n")
+
+    for photos in walk_photos(source_dir, workers):
+        for rel_path, strata in photo_strata(photos, source_dir, positions):
+            key = sample_key(rel_path, seed)
+            for stratum in strata:
+                population[stratum] = population.get(stratum, 0) + 1
+                heap = reservoirs.setdefault(stratum, [])
+                entry = (-key, rel_path, strata)
+                if len(heap) < target:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        scanned += len(photos)
+
+    print(f"扫描 {scanned} 张照片，{len(reservoirs)} 个分层")
+
+    # 每层候选按采样键升序排列
+    candidates = {stratum: sorted(heap, reverse=True) for stratum, heap in reservoirs.items()}
+    cursors = dict.fromkeys(candidates, 0)
+    covered = dict.fromkeys(candidates, 0)
+
+    selected = {}
+    destinations = set()
+    while len(selected) < target:
+        open_strata = [s for s in candidates if cursors[s] < len(candidates[s])]
+        if not open_strata:
+            break
+        # 覆盖最少的层优先，其次是样本少（稀有）的层
+        stratum = min(open_strata, key=lambda s: (covered[s], population[s], s))
+        _, rel_path, strata = candidates[stratum][cursors[stratum]]
+        cursors[stratum] += 1
+        if rel_path in selected:
             continue
-            
-        photos = collect_photos(str(full_path))
-        
-        if not photos:
-            print(f"⚠️  没有找到照片: {category_path}")
+        # 不同目录中的同名照片导入后会互相覆盖，只保留先选中的一张
+        name = destination_name({'original_rel': rel_path, 'strata': strata})
+        if name in destinations:
             continue
-        
-        sample_size = min(count, len(photos))
-        sampled = random.sample(photos, sample_size)
-        
-        for photo_path in sampled:
-            rel_path = os.path.relpath(photo_path, SOURCE_DIR)
-            new_filename = f"{category_key}_{os.path.basename(photo_path)}"
-            selected.append({
-                'source': photo_path,
-                'destination': OUTPUT_DIR / new_filename,
-                'original_rel': rel_path,
-            })
-        
-        print(f"✅ {category_path}: 从 {len(photos)} 张中选择 {sample_size} 张")
-    
-    return selected
-
-def copy_samples(samples):
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    
-    copied = 0
-    for sample in samples:
+        destinations.add(name)
+        selected[rel_path] = strata
+        for s in strata:
+            covered[s] += 1
+
+    for position in [*positions, 'category']:
+        strata = [s for s in population if s[0] == position]
+        if strata:
+            hit = sum(1 for s in strata if covered[s])
+            print(f"✅ {position}: 覆盖 {hit}/{len(strata)} 个取值")
+
+    return [{
+        'source': str(Path(source_dir) / rel_path),
+        'original_rel': rel_path,
+        'strata': strata,
+    } for rel_path, strata in sorted(selected.items())]
+
+
+def destination_name(sample):
+    """编码文件名保持不变，其余加分类前缀"""
+    stratum = sample['strata'][0]
+    name = os.path.basename(sample['original_rel'])
+    return f"{stratum[1]}_{name}" if stratum[0] == 'category' else name
+
+
+def reflink(src, dst):
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def import_file(src, dst, hardlink=False):
+    """
+    导入单个文件：reflink → 复制；hardlink=True 时为 硬链接 → 复制
+
+    reflink 是写时复制，与复制一样不会让应用资源和源照片共享可写数据；
+    硬链接则共享同一份数据，仅在明确要求时使用。
+    先写入临时文件再原子替换目标。
+
+    Returns:
+        使用的方式
+    """
+    tmp = Path(f'{dst}.tmp')
+    tmp.unlink(missing_ok=True)
+    if hardlink:
+        methods = [('hardlink', os.link)]
+    else:
+        methods = [('reflink', reflink)] if fcntl else []
+    methods.append(('copy', shutil.copy2))
+    for method, func in methods:
         try:
-            shutil.copy2(sample['source'], sample['destination'])
-            copied += 1
-        except Exception as e:
-            print(f"❌ 复制失败: {sample['source']} -> {e}")
-    
-    print(f"\n已复制 {copied}/{len(samples)} 张照片到 {OUTPUT_DIR}")
+            func(src, tmp)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            continue
+        os.replace(tmp, dst)
+        return method
+    raise OSError(f'无法导入 {src}')
+
+
+def copy_samples(samples, output_dir=OUTPUT_DIR, workers=8, hardlink=False):
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # select_samples 已保证目标文件名互不相同
+    for sample in samples:
+        sample['destination'] = output_dir / destination_name(sample)
+
+    methods = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(import_file, s['source'], s['destination'], hardlink): s
+                   for s in samples}
+        for future, sample in futures.items():
+            try:
+                method = future.result()
+                methods[method] = methods.get(method, 0) + 1
+            except Exception as e:
+                print(f"❌ 导入失败: {sample['source']} -> {e}")
+
+    copied = sum(methods.values())
+    detail = ', '.join(f"{method} {count}" for method, count in methods.items())
+    print(f"\n已导入 {copied}/{len(samples)} 张照片到 {output_dir} ({detail})")
     return copied
 
-def generate_asset_manifest(samples):
-    manifest_path = OUTPUT_DIR.parent / "asset_manifest.json"
-    
+
+def generate_asset_manifest(samples, output_dir=OUTPUT_DIR):
+    manifest_path = output_dir.parent / "asset_manifest.json"
+
     manifest = {
         "version": "1.0",
         "generated_at": str(Path(__file__).resolve()),
@@ -90,9 +252,9 @@ def generate_asset_manifest(samples):
         "categories": {},
         "files": []
     }
-    
+
     for sample in samples:
-        category = sample['original_rel'].split(os.sep)[0] + "_" + sample['original_rel'].split(os.sep)[1]
+        category = directory_category(sample['original_rel'])
         if category not in manifest["categories"]:
             manifest["categories"][category] = 0
         manifest["categories"][category] += 1
@@ -101,29 +263,59 @@ def generate_asset_manifest(samples):
             "asset_path": f"assets/images/pose_samples/{Path(sample['destination']).name}",
             "category": category,
         })
-    
+
     with open(manifest_path, 'w', encoding='utf-8') as f:
-        import json
         json.dump(manifest, f, ensure_ascii=False, indent=2)
-    
+
     print(f"📋 资源清单已生成: {manifest_path}")
     return manifest
 
-if __name__ == "__main__":
-    random.seed(42)
-    
+
+def main():
+    parser = argparse.ArgumentParser(description='照片样本选择工具')
+    parser.add_argument('--source', type=str, default=str(SOURCE_DIR), help='源照片目录')
+    parser.add_argument('--output', type=str, default=str(OUTPUT_DIR), help='输出目录')
+    parser.add_argument('--count', type=int, default=TARGET_COUNT,
+                        help=f'选择的照片数 (默认{TARGET_COUNT})')
+    parser.add_argument('--positions', type=str, default=','.join(POSITIONS),
+                        help='参与分层的编码位，逗号分隔 (默认全部12位)')
+    parser.add_argument('--workers', type=int, default=8, help='遍历与导入的线程数 (默认8)')
+    parser.add_argument('--seed', type=int, default=42, help='采样种子 (默认42)')
+    parser.add_argument('--hardlink', action='store_true',
+                        help='以硬链接导入（不占额外空间，但与源照片共享数据）')
+    parser.add_argument('--no-manifest', action='store_true', help='不生成资源清单')
+
+    args = parser.parse_args()
+
+    positions = [p.strip() for p in args.positions.split(',') if p.strip()]
+    unknown = [p for p in positions if p not in POSITIONS]
+    if unknown:
+        print(f"未知编码位: {', '.join(unknown)} (可用: {', '.join(POSITIONS)})")
+        return
+
+    source_dir = Path(args.source)
+    output_dir = Path(args.output)
+    if not source_dir.exists():
+        print(f"⚠️  路径不存在: {source_dir}")
+        return
+
     print("=" * 60)
     print("📸 照片样本选择工具")
     print("=" * 60)
-    
-    samples = select_samples()
-    
+
+    samples = select_samples(source_dir, args.count, positions, args.workers, args.seed)
+
     if samples:
-        copied = copy_samples(samples)
-        generate_asset_manifest(samples)
-        
+        copy_samples(samples, output_dir, args.workers, args.hardlink)
+        if not args.no_manifest:
+            generate_asset_manifest(samples, output_dir)
+
         print("\n" + "=" * 60)
         print(f"🎉 完成！已选择 {len(samples)} 张代表性照片")
         print("=" * 60)
     else:
         print("\n❌ 没有找到任何照片")
+
+
+if __name__ == "__main__":
+    main()